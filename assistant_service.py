@@ -0,0 +1,328 @@
+# Chat assistant service behind the AI chat modal.
+#
+# Python counterpart of generateAiResponse in script.js. Instead of a chain
+# of includes() checks, intent keywords are compiled once into an inverted
+# index (keyword -> (intent, keyword group)); a message is tokenized into
+# words and bigrams and each token is looked up once. The figures quoted in
+# the answers (expense spike, savings from cutting expenses, average income,
+# ending cash) are computed from the client's monthly aggregates, and each
+# answer is memoized per (client, intent, parameters, data version), so a
+# repeated question is a dict lookup until the client's data changes.
+# Given a scenario_simulator.ScenarioSimulator that has the client's daily
+# history, the expense-cut answer quotes the simulated cash range instead of
+# the straight-line projection.
+# Every call is timed for p50/p99 reporting.
+
+import argparse
+import re
+import time
+import zlib
+from collections import OrderedDict, deque
+
+ANSWER_CACHE_SIZE = 10000
+LATENCY_SAMPLES = 10000
+DEFAULT_EXPENSE_CUT_PCT = 15
+# Months of savings counted when projecting the effect of an expense cut
+CUT_PROJECTION_MONTHS = 3
+
+MONTHS = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+MONTH_WORDS = {
+    **{m: i for i, m in enumerate(MONTHS)},
+    **{name: i for i, name in enumerate([
+        'january', 'february', 'march', 'april', 'may', 'june', 'july',
+        'august', 'september', 'october', 'november', 'december'])},
+    'sept': 8,
+}
+# 'may' is only read as the month after one of these, before a year, or when capitalised
+# ("expenses in may", "May 2025", "were May expenses high"); otherwise it is the verb
+MONTH_PREPOSITIONS = {'in', 'for', 'during', 'of', 'since', 'until', 'through', 'from', 'by', 'last', 'this', 'next'}
+PRONOUNS = {'i', 'we', 'you', 'they', 'it'}
+MODAL_MAY = 'may (verb)'
+
+# Demo book from generatePulseLabsData (income/expenses per month and the
+# month-end cash balance); the last month is still open.
+PULSE_LABS_MONTHLY = [
+    {'month': 'Jan', 'income': 70000, 'expenses': 65000, 'cash': 85000},
+    {'month': 'Feb', 'income': 75000, 'expenses': 61000, 'cash': 88000},
+    {'month': 'Mar', 'income': 74000, 'expenses': 65500, 'cash': 103000},
+    {'month': 'Apr', 'income': 69000, 'expenses': 80000, 'cash': 114000},
+    {'month': 'May', 'income': 79000, 'expenses': 65000, 'cash': 102000},
+    {'month': 'Jun', 'income': 71000, 'expenses': 59500, 'cash': 115000},
+    {'month': 'Jul', 'income': 79000, 'expenses': 67000, 'cash': 124000},
+    {'month': 'Aug', 'income': 70000, 'expenses': 95000, 'cash': 137000},
+    {'month': 'Sep', 'income': 69500, 'expenses': 121000, 'cash': 112000},
+    {'month': 'Oct', 'income': 40000, 'expenses': 25000, 'cash': 61000},
+    {'month': 'Nov', 'income': 0, 'expenses': 0, 'cash': 74000},
+]
+
+# Checked in this order, mirroring generateAiResponse. Every keyword group
+# must be hit for the intent to match.
+INTENTS = [
+    ('expense_month', [{'expense', 'expenses', 'spending', 'costs'}, set(MONTH_WORDS)]),
+    ('cash_flow', [{'cash flow', 'positive'}]),
+    ('reduce_expenses', [{'reduce', 'cut', 'lower'}, {'expense', 'expenses', 'spending', 'costs'}]),
+    ('forecast', [{'forecast', 'predict', 'prediction', 'projection'}]),
+    ('income', [{'income', 'revenue'}]),
+]
+
+DEFAULT_RESPONSES = [
+    "That's an interesting question about your cash flow data. Based on the chart, I can see several "
+    "trends that might be relevant. Could you be more specific about which aspect you'd like me to analyze?",
+    "Looking at your financial data, I notice some patterns in your cash flow. What specific insights are "
+    "you looking for to help with your business decisions?",
+    "Your cash flow data shows both opportunities and areas for attention. I'd be happy to dive deeper into "
+    "any specific metrics or time periods you're concerned about.",
+]
+
+NO_ACTIVITY_RESPONSE = ("I don't see any income or expenses on your accounts yet. Once transactions start "
+                        "coming in I can break down your cash flow and answer questions like this one.")
+NO_DATA_RESPONSE = ("I don't have any account data for you yet. Connect a bank account and I'll be able to "
+                    "answer questions about your cash flow.")
+
+_WORD = re.compile(r"[a-z]+|\d+(?:\.\d+)?%?", re.IGNORECASE)
+_YEAR = re.compile(r'\d{4}')
+
+
+def _build_index(intents):
+    index = {}
+    for intent_rank, (_, groups) in enumerate(intents):
+        for group_rank, keywords in enumerate(groups):
+            for keyword in keywords:
+                index.setdefault(keyword, []).append((intent_rank, group_rank))
+    return index
+
+
+KEYWORD_INDEX = _build_index(INTENTS)
+
+
+def _may_is_month(words, i):
+    before = words[i - 1].lower() if i else None
+    after = words[i + 1] if i + 1 < len(words) else ''
+    if before in MONTH_PREPOSITIONS or _YEAR.fullmatch(after):
+        return True
+    if words[i][0].isupper():
+        # Sentence-initial "May I ..." asks permission; "May expenses ..." names the month
+        return i > 0 or after.lower() not in PRONOUNS
+    return False
+
+
+def tokenize(message):
+    raw = _WORD.findall(message)
+    words = [MODAL_MAY if w.lower() == 'may' and not _may_is_month(raw, i) else w.lower()
+             for i, w in enumerate(raw)]
+    return words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+
+
+def match_intent(message):
+    """(intent name, tokens) for the first intent whose keyword groups are all hit, else (None, tokens)."""
+    tokens = tokenize(message)
+    hit = {}
+    for token in tokens:
+        for intent_rank, group_rank in KEYWORD_INDEX.get(token, ()):
+            hit.setdefault(intent_rank, set()).add(group_rank)
+    for intent_rank in sorted(hit):
+        name, groups = INTENTS[intent_rank]
+        if len(hit[intent_rank]) == len(groups):
+            return name, tokens
+    return None, tokens
+
+
+def _k(value, digits=0):
+    thousands = round(value / 1000, digits)
+    # Sign ahead of the dollar sign: -$17K, not $-17K
+    return f"{'-' if thousands < 0 else ''}${abs(thousands):,.{digits}f}K"
+
+
+def _closed(months):
+    """Months with activity (drops the open, still-empty month)."""
+    return [m for m in months if m['income'] or m['expenses']]
+
+
+def _intent_params(intent, tokens):
+    if intent == 'expense_month':
+        return next(MONTH_WORDS[t] for t in tokens if t in MONTH_WORDS)
+    if intent == 'reduce_expenses':
+        pct = next((float(t[:-1]) for t in tokens if t.endswith('%')), DEFAULT_EXPENSE_CUT_PCT)
+        return pct
+    return None
+
+
+def compose_answer(intent, params, months):
+    """Answer text for an intent, with every figure computed from the monthly aggregates."""
+    active = _closed(months)
+    if not active:
+        return NO_ACTIVITY_RESPONSE
+    avg_income = sum(m['income'] for m in active) / len(active)
+    avg_expenses = sum(m['expenses'] for m in active) / len(active)
+    ending_cash = months[-1]['cash']
+    opening_cash = months[0]['cash']
+
+    if intent == 'expense_month':
+        # The most recent one if the book repeats a month
+        month = next((m for m in reversed(months) if m['month'].lower() == MONTHS[params]), None)
+        if month is None or not month['expenses']:
+            return f"I don't have expense data for {MONTHS[params].title()} yet."
+        ratio = month['expenses'] / avg_expenses
+        if ratio >= 1.2:
+            return (f"I can see that {month['month']} had a significant expense spike to "
+                    f"{_k(month['expenses'])}, which is much higher than your average of {_k(avg_expenses)}. "
+                    "This appears to be driven by one-time costs. Would you like me to analyze the specific "
+                    "categories driving this increase?")
+        return (f"{month['month']} expenses were {_k(month['expenses'])}, "
+                f"{'in line with' if ratio > 0.8 else 'well below'} your average of {_k(avg_expenses)}.")
+
+    if intent == 'cash_flow':
+        spike = max(active, key=lambda m: m['expenses'])
+        direction = 'lower' if ending_cash < opening_cash else 'higher'
+        return ("Based on your current data, your cash flow shows some volatility with an overall "
+                f"{'positive' if avg_income >= avg_expenses else 'negative'} trajectory. Your ending cash "
+                f"position of {_k(ending_cash, 1)} is {direction} than the beginning period, primarily due to "
+                f"the {spike['month']} expense spike. I'd recommend focusing on expense management.")
+
+    if intent == 'reduce_expenses':
+        savings = avg_expenses * params / 100
+        improved = ending_cash + savings * CUT_PROJECTION_MONTHS
+        return (f"Great question! If you reduce expenses by {params:g}%, that would save approximately "
+                f"{_k(savings, 1)} monthly based on your average. Over the next {CUT_PROJECTION_MONTHS} months "
+                f"this could improve your ending cash position from {_k(ending_cash, 1)} to around "
+                f"{_k(improved)}, providing a much healthier buffer for operations.")
+
+    if intent == 'forecast':
+        recent = active[-3:]
+        net = sorted(m['income'] - m['expenses'] for m in recent)
+        low, high = ending_cash + net[0], ending_cash + net[-1]
+        return ("Based on your historical patterns, I predict your cash position will land around "
+                f"{_k(min(low, high))}-{_k(max(low, high))} next month if you maintain current income levels "
+                "and control expense volatility.")
+
+    if intent == 'income':
+        incomes = [m['income'] for m in active]
+        dip = min(active, key=lambda m: m['income'])
+        return (f"Your income shows good consistency, averaging {_k(avg_income, 1)} monthly with a range of "
+                f"{_k(min(incomes))}-{_k(max(incomes))}. The dip in {dip['month']} stands out, but your core "
+                "business income remains stable. I'd suggest exploring ways to boost the lower months.")
+
+    raise ValueError(f'unknown intent {intent!r}')
+
+
+def simulated_cut_answer(pct, baseline, scenario):
+    """Expense-cut answer from scenario_simulator results (baseline and cut over the same draws)."""
+    days = scenario['days']
+    low, mid, high = (scenario['ending'][p] for p in (10, 50, 90))
+    answer = (f"If you reduce expenses by {pct:g}%, {scenario['paths']:,} simulated {days}-day paths put your "
+              f"cash at around {_k(mid)} (likely range {_k(low)} to {_k(high)}), compared with "
+              f"{_k(baseline['ending'][50])} if nothing changes.")
+    before, after = f"{baseline['p_negative']:.0%}", f"{scenario['p_negative']:.0%}"
+    if baseline['p_negative'] >= 0.01 and before != after:
+        answer += f" The chance of cash dipping below zero in that time falls from {before} to {after}."
+    return answer
+
+
+class LatencyRecorder:
+    """Bounded window of call durations with percentile readout."""
+
+    def __init__(self, size=LATENCY_SAMPLES):
+        self.samples = deque(maxlen=size)
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, pct):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class AssistantService:
+    """Per-client monthly data, intent matching and memoized answers."""
+
+    def __init__(self, cache_size=ANSWER_CACHE_SIZE, simulator=None):
+        self.simulator = simulator
+        self.data = {}
+        self.versions = {}
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self.latency = LatencyRecorder()
+
+    def set_data(self, client, months):
+        """Replace a client's monthly aggregates; bumps the data version so cached answers expire."""
+        self.data[client] = list(months)
+        self.versions[client] = self.versions.get(client, 0) + 1
+
+    def answer(self, client, message):
+        start = time.perf_counter()
+        try:
+            intent, tokens = match_intent(message)
+            if intent is None:
+                return DEFAULT_RESPONSES[zlib.crc32(message.encode('utf-8')) % len(DEFAULT_RESPONSES)]
+
+            params = _intent_params(intent, tokens)
+            simulated = intent == 'reduce_expenses' and self.simulator is not None and self.simulator.has(client)
+            if not simulated and client not in self.data:
+                return NO_DATA_RESPONSE
+            key = (client, intent, params, self.versions.get(client),
+                   self.simulator.versions[client] if simulated else None)
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return cached
+
+            self.misses += 1
+            if simulated:
+                text = simulated_cut_answer(params, *self.simulator.what_if(client, expense_cut_pct=params))
+            else:
+                text = compose_answer(intent, params, self.data[client])
+            self.cache[key] = text
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return text
+        finally:
+            self.latency.record(time.perf_counter() - start)
+
+    def stats(self):
+        return {
+            'calls': len(self.latency.samples),
+            'cache_hits': self.hits,
+            'cache_misses': self.misses,
+            'p50_us': self.latency.percentile(50) * 1e6,
+            'p99_us': self.latency.percentile(99) * 1e6,
+        }
+
+
+SAMPLE_QUESTIONS = [
+    'Why were expenses so high in September?',
+    'Is my cash flow positive?',
+    'What if I reduce expenses by 15%?',
+    'Can you forecast next month?',
+    'How is my income trending?',
+    'What should I look at?',
+]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ask the assistant the sample questions and report latency')
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    service = AssistantService()
+    for client in range(args.clients):
+        service.set_data(client, PULSE_LABS_MONTHLY)
+
+    for question in SAMPLE_QUESTIONS:
+        print(f'Q: {question}\nA: {service.answer(0, question)}\n')
+
+    for _ in range(args.rounds):
+        for client in range(args.clients):
+            for question in SAMPLE_QUESTIONS:
+                service.answer(client, question)
+
+    stats = service.stats()
+    print('Assistant latency (last {calls:,} calls)'.format(**stats))
+    print('=' * 100)
+    print(f"  p50 {stats['p50_us']:.1f}us  p99 {stats['p99_us']:.1f}us  "
+          f"cache hits {stats['cache_hits']:,}  misses {stats['cache_misses']:,}")
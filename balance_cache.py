@@ -0,0 +1,221 @@
+# Balance cache for the Real-Time Balance Card ("Last updated: 2m").
+#
+# Entries are keyed by (client, bank account) and kept in LRU order, at most
+# max_entries of them. A read within ttl seconds of the last fetch is a hit.
+# Past ttl but within ttl + stale_ttl, the cached balance is returned at once
+# together with its age, and a refresh is queued in the background
+# (stale-while-revalidate), so the card does not wait on the bank. Only a
+# key never seen, or older than ttl + stale_ttl, waits for the upstream call.
+#
+# Refreshes are queued per bank and flushed after batch_window seconds, so
+# every account of a bank that came due in that window is fetched with one
+# fetch_batch(bank, keys) call (at most max_batch keys each). A key already
+# queued or in flight is not queued again. Counters (hits, stale hits,
+# misses, batches, errors, evictions) are exposed through stats() and in
+# Prometheus text for tuning ttl against upstream cost.
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+from collections import OrderedDict
+
+TTL = 30.0
+STALE_TTL = 300.0
+MAX_ENTRIES = 100_000
+BATCH_WINDOW = 0.05
+MAX_BATCH = 100
+
+LOG = logging.getLogger('balance_cache')
+
+
+def bank_of(account):
+    """Bank code of an account id such as PNC-0001."""
+    return account.split('-', 1)[0]
+
+
+class BalanceCache:
+    def __init__(self, fetch_batch, ttl=TTL, stale_ttl=STALE_TTL, max_entries=MAX_ENTRIES,
+                 batch_window=BATCH_WINDOW, max_batch=MAX_BATCH, on_refresh=None, clock=time.monotonic):
+        # async fetch_batch(bank, [(client, account), ...]) -> {(client, account): payload}
+        self.fetch_batch = fetch_batch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.on_refresh = on_refresh
+        self.clock = clock
+        # (client, account) -> (fetched_at, payload), least recently used first
+        self.entries = OrderedDict()
+        # bank -> {(client, account): future} waiting for the next flush
+        self._queued = {}
+        self._in_flight = {}
+        # Running refresh tasks; the loop only keeps weak references to them
+        self._tasks = set()
+        self.counters = dict.fromkeys(('hits', 'stale_hits', 'misses', 'batches', 'refreshed', 'errors',
+                                       'evictions'), 0)
+
+    async def get(self, client, account):
+        """(payload, age_seconds); only waits on the bank when nothing usable is cached."""
+        key = (client, account)
+        entry = self.entries.get(key)
+        now = self.clock()
+        if entry is not None:
+            age = now - entry[0]
+            if age < self.ttl:
+                self.counters['hits'] += 1
+                self.entries.move_to_end(key)
+                return entry[1], age
+            if age < self.ttl + self.stale_ttl:
+                self.counters['stale_hits'] += 1
+                self.entries.move_to_end(key)
+                self._queue(key)
+                return entry[1], age
+        self.counters['misses'] += 1
+        payload = await asyncio.shield(self._queue(key))
+        return payload, 0.0
+
+    def invalidate(self, client, account):
+        self.entries.pop((client, account), None)
+
+    def _queue(self, key):
+        future = self._in_flight.get(key)
+        if future is not None:
+            return future
+        bank = bank_of(key[1])
+        queued = self._queued.get(bank)
+        if queued is None:
+            queued = self._queued[bank] = {}
+            asyncio.get_running_loop().call_later(self.batch_window, self._flush, bank)
+        future = queued.get(key)
+        if future is None:
+            future = queued[key] = asyncio.get_running_loop().create_future()
+            # Stale readers never await it; keep an unretrieved error from being logged
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return future
+
+    def _flush(self, bank):
+        queued = self._queued.pop(bank, {})
+        keys = list(queued)
+        for start in range(0, len(keys), self.max_batch):
+            batch = {key: queued[key] for key in keys[start:start + self.max_batch]}
+            self._in_flight.update(batch)
+            task = asyncio.ensure_future(self._refresh(bank, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, bank, batch):
+        self.counters['batches'] += 1
+        try:
+            payloads = await self.fetch_batch(bank, list(batch))
+            fetched_at = self.clock()
+            for key, future in batch.items():
+                self._in_flight.pop(key, None)
+                payload = payloads.get(key)
+                if payload is None:
+                    self.counters['errors'] += 1
+                    if not future.done():
+                        future.set_exception(KeyError(f'bank {bank} returned no balance for {key[1]}'))
+                    continue
+                self.entries[key] = (fetched_at, payload)
+                self.entries.move_to_end(key)
+                self.counters['refreshed'] += 1
+                if not future.done():
+                    future.set_result(payload)
+                if self.on_refresh:
+                    try:
+                        self.on_refresh(key[0], key[1], payload)
+                    except Exception:
+                        LOG.exception('on_refresh failed for %s', key[1])
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.counters['evictions'] += 1
+        except BaseException as exc:
+            self.counters['errors'] += 1
+            # Fail whatever is still pending so no reader waits on it forever
+            error = exc if isinstance(exc, Exception) else RuntimeError(f'balance refresh for {bank} aborted')
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(error)
+            if not isinstance(exc, Exception):
+                raise
+        finally:
+            for key in batch:
+                self._in_flight.pop(key, None)
+
+    def stats(self):
+        reads = self.counters['hits'] + self.counters['stale_hits'] + self.counters['misses']
+        return {
+            **self.counters,
+            'entries': len(self.entries),
+            'hit_ratio': (self.counters['hits'] + self.counters['stale_hits']) / reads if reads else 0.0,
+            'mean_batch': self.counters['refreshed'] / self.counters['batches'] if self.counters['batches'] else 0.0,
+        }
+
+    def prometheus_lines(self, prefix='b360_balance_cache'):
+        lines = [f'# HELP {prefix}_events_total Balance cache reads and refreshes by outcome.',
+                 f'# TYPE {prefix}_events_total counter']
+        lines += [f'{prefix}_events_total{{event="{name}"}} {value}' for name, value in self.counters.items()]
+        lines += [f'# HELP {prefix}_entries Cached (client, account) balances.', f'# TYPE {prefix}_entries gauge',
+                  f'{prefix}_entries {len(self.entries)}']
+        return lines
+
+
+async def demo(args):
+    upstream_calls = 0
+
+    async def fetch_batch(bank, keys):
+        nonlocal upstream_calls
+        upstream_calls += 1
+        await asyncio.sleep(args.bank_latency)
+        return {key: {'balance': round(random.uniform(2000, 90000), 2)} for key in keys}
+
+    cache = BalanceCache(fetch_batch, ttl=args.ttl, stale_ttl=args.stale_ttl, max_entries=args.max_entries)
+    banks = ['PNC', 'CHASE', 'WELLS', 'BOFA']
+    accounts = [f'{random.choice(banks)}-{i:05d}' for i in range(args.accounts)]
+    latencies = {'fresh': [], 'stale': [], 'wait': []}
+
+    async def card_reader(seed):
+        rnd = random.Random(seed)
+        deadline = time.monotonic() + args.duration
+        while time.monotonic() < deadline:
+            # Skewed: a few clients open the dashboard far more often than the rest
+            account = accounts[min(int(rnd.paretovariate(1.2)) - 1, len(accounts) - 1)]
+            entry = cache.entries.get(('client-1', account))
+            age = time.monotonic() - entry[0] if entry else float('inf')
+            kind = 'fresh' if age < cache.ttl else 'stale' if age < cache.ttl + cache.stale_ttl else 'wait'
+            start = time.perf_counter()
+            await cache.get('client-1', account)
+            latencies[kind].append(time.perf_counter() - start)
+            await asyncio.sleep(rnd.expovariate(1 / args.think))
+
+    await asyncio.gather(*(card_reader(seed) for seed in range(args.readers)))
+    stats = cache.stats()
+    reads = stats['hits'] + stats['stale_hits'] + stats['misses']
+
+    print('Balance cache')
+    print('=' * 100)
+    print(f"  {reads:,} card reads, {upstream_calls:,} upstream batch calls "
+          f"({stats['refreshed']:,} balances, {stats['mean_batch']:.1f} per call)")
+    print(f"  hits {stats['hits']:,}  stale hits {stats['stale_hits']:,}  misses {stats['misses']:,}  "
+          f"evictions {stats['evictions']:,}  hit ratio {stats['hit_ratio']:.1%}")
+    for kind, samples in latencies.items():
+        samples.sort()
+        if samples:
+            print(f'  {kind:<6} p50 {samples[len(samples) // 2] * 1000:7.2f}ms  '
+                  f'p99 {samples[int(len(samples) * 0.99)] * 1000:7.2f}ms  ({len(samples):,} reads)')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Simulate Balance Card reads against a slow bank API')
+    parser.add_argument('--accounts', type=int, default=5000)
+    parser.add_argument('--readers', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--think', type=float, default=0.01, help='mean seconds between a reader\'s requests')
+    parser.add_argument('--ttl', type=float, default=1.0)
+    parser.add_argument('--stale-ttl', type=float, default=10.0)
+    parser.add_argument('--max-entries', type=int, default=MAX_ENTRIES)
+    parser.add_argument('--bank-latency', type=float, default=0.08)
+    asyncio.run(demo(parser.parse_args()))
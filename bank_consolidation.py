@@ -0,0 +1,179 @@
+# Multi-bank consolidation for upgrade FLOW 4 ("Screen refreshes showing
+# multi-bank graph").
+#
+# Each connected bank (PNC, Chase, Wells Fargo, BofA, ...) delivers its
+# transactions already sorted by time. The streams are k-way merged with a
+# heap (heapq.merge), so only one pending transaction per bank is held for
+# the merge. Transfers between the client's own accounts show up twice - an
+# outflow at one bank and an inflow at another - and would double count in
+# the consolidated graph; they are cancelled with a hash join on
+# (amount, from account, to account) within a settlement window. Output is
+# held back only behind an unmatched transfer leg, and at most for that
+# window, so memory is bounded by window x volume, not by history length or
+# the number of linked banks.
+#
+# Transaction shape: {'id', 'bank', 'account', 'ts', 'amount_cents', 'counterparty'}
+# where counterparty is the other account's id when it is known.
+
+import argparse
+import heapq
+import random
+from collections import deque
+
+from transaction_ingest import SECONDS_PER_DAY, read_feed
+
+TRANSFER_WINDOW = 3 * SECONDS_PER_DAY
+
+
+class Consolidator:
+    """Streaming merge + own-account transfer cancellation."""
+
+    def __init__(self, own_accounts, window=TRANSFER_WINDOW, on_transfer=None):
+        self.own_accounts = set(own_accounts)
+        self.window = window
+        self.on_transfer = on_transfer
+        # [txn, cancelled, waiting_for_match] in arrival (time) order
+        self._buffer = deque()
+        # (amount, from, to, direction) -> deque of unmatched buffer entries
+        self._pending = {}
+        self.merged = 0
+        self.emitted = 0
+        self.transfers = 0
+
+    def _transfer_key(self, txn):
+        """Join key for a transfer leg, or None if the txn is not between own accounts."""
+        counterparty = txn.get('counterparty')
+        if counterparty not in self.own_accounts or txn['account'] not in self.own_accounts:
+            return None
+        amount = txn['amount_cents']
+        if amount < 0:
+            return (-amount, txn['account'], counterparty), 'out'
+        return (amount, counterparty, txn['account']), 'in'
+
+    def _push(self, txn):
+        entry = [txn, False, False]
+        joined = self._transfer_key(txn)
+        if joined is not None:
+            key, direction = joined
+            other = 'in' if direction == 'out' else 'out'
+            candidates = self._pending.get(key + (other,))
+            if candidates:
+                match = candidates.popleft()
+                if not candidates:
+                    del self._pending[key + (other,)]
+                match[1] = entry[1] = True
+                match[2] = False
+                self.transfers += 1
+                if self.on_transfer:
+                    self.on_transfer(match[0], txn)
+            else:
+                entry[2] = True
+                self._pending.setdefault(key + (direction,), deque()).append(entry)
+        self._buffer.append(entry)
+
+    def _drain(self, until_ts):
+        """Release buffered transactions up to the oldest transfer leg still inside the window."""
+        buffer = self._buffer
+        while buffer and (not buffer[0][2] or buffer[0][0]['ts'] < until_ts):
+            txn, cancelled, waiting_for_match = buffer.popleft()
+            if cancelled:
+                continue
+            if waiting_for_match:
+                # Window expired without a match: it is a real external flow
+                key, direction = self._transfer_key(txn)
+                waiting = self._pending[key + (direction,)]
+                waiting.popleft()
+                if not waiting:
+                    del self._pending[key + (direction,)]
+            self.emitted += 1
+            yield txn
+
+    def consolidate(self, streams):
+        """Merge per-bank sorted streams into one sorted stream without own-account transfers."""
+        for txn in heapq.merge(*streams, key=lambda t: t['ts']):
+            self.merged += 1
+            # Expire first so anything still pending is within the window of txn
+            yield from self._drain(txn['ts'] - self.window)
+            self._push(txn)
+        yield from self._drain(float('inf'))
+
+    @property
+    def buffered(self):
+        return len(self._buffer)
+
+
+def daily_net(txns):
+    """Fold a time-sorted transaction stream into (day, net_cents) pairs for the graph."""
+    day = None
+    net = 0
+    for txn in txns:
+        txn_day = int(txn['ts'] // SECONDS_PER_DAY)
+        if txn_day != day:
+            if day is not None:
+                yield day, net
+            day, net = txn_day, 0
+        net += txn['amount_cents']
+    if day is not None:
+        yield day, net
+
+
+def read_bank_feed(path):
+    """A bank's NDJSON export, already sorted by ts."""
+    return read_feed(path)
+
+
+def synthetic_banks(n_banks, n_txns, n_transfers, seed=0):
+    """Sorted per-bank streams with some transfers between the client's own accounts."""
+    rnd = random.Random(seed)
+    banks = ['PNC', 'CHASE', 'WELLS', 'BOFA', 'CITI', 'USB', 'TRUIST', 'CAPONE'][:n_banks]
+    accounts = {bank: f'{bank}-{rnd.randrange(1000, 9999)}' for bank in banks}
+    start = 1_760_000_000.0
+    per_bank = {bank: [] for bank in banks}
+    seq = 0
+    for _ in range(n_txns):
+        bank = rnd.choice(banks)
+        seq += 1
+        per_bank[bank].append({
+            'id': f'{bank}-{seq}', 'bank': bank, 'account': accounts[bank],
+            'ts': start + rnd.random() * 90 * SECONDS_PER_DAY,
+            'amount_cents': int(rnd.gauss(0, 300_000)), 'counterparty': f'EXT-{rnd.randrange(500)}',
+        })
+    for _ in range(n_transfers):
+        src, dst = rnd.sample(banks, 2)
+        amount = rnd.randrange(100_000, 5_000_000)
+        ts = start + rnd.random() * 88 * SECONDS_PER_DAY
+        seq += 1
+        per_bank[src].append({'id': f'{src}-{seq}', 'bank': src, 'account': accounts[src], 'ts': ts,
+                              'amount_cents': -amount, 'counterparty': accounts[dst]})
+        seq += 1
+        per_bank[dst].append({'id': f'{dst}-{seq}', 'bank': dst, 'account': accounts[dst],
+                              'ts': ts + rnd.random() * 2 * SECONDS_PER_DAY,
+                              'amount_cents': amount, 'counterparty': accounts[src]})
+    for txns in per_bank.values():
+        txns.sort(key=lambda t: t['ts'])
+    return list(accounts.values()), [iter(txns) for txns in per_bank.values()]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Consolidate synthetic multi-bank streams')
+    parser.add_argument('--banks', type=int, default=4)
+    parser.add_argument('--transactions', type=int, default=200_000)
+    parser.add_argument('--transfers', type=int, default=2_000)
+    args = parser.parse_args()
+
+    own_accounts, streams = synthetic_banks(args.banks, args.transactions, args.transfers)
+    consolidator = Consolidator(own_accounts)
+    peak_buffer = 0
+    days = 0
+    for day, net in daily_net(consolidator.consolidate(streams)):
+        days += 1
+        peak_buffer = max(peak_buffer, consolidator.buffered)
+
+    print('Multi-bank consolidation')
+    print('=' * 100)
+    print(f'  banks merged:          {args.banks}')
+    print(f'  transactions merged:   {consolidator.merged:,}')
+    print(f'  transfers cancelled:   {consolidator.transfers:,} of {args.transfers:,}')
+    print(f'  transactions emitted:  {consolidator.emitted:,}')
+    print(f'  days on graph:         {days}')
+    print(f'  peak buffered txns:    {peak_buffer:,}')
@@ -0,0 +1,226 @@
+# End-to-end benchmark suite for the data backend.
+#
+# Generates seeded synthetic business data (synthetic_business.py) at one or
+# more scales and times each server-side path the dashboard depends on:
+#
+#   generate          synthetic transactions
+#   ingest            TransactionIngest over event dicts (first --ingest-limit rows)
+#   daily_net         (account x day) net flow matrix, one bincount
+#   rollup_build      RollupIndex.from_daily_net per account
+#   chart_queries     RollupIndex.query for every account x period pill
+#   store_write       ColumnarStore.write_batch into a temp directory
+#   store_queries     ColumnarStore.period for every account x period pill
+#   insights          InsightEngine.run on a book built from the data
+#   insights_repeat   the same run again (nothing changed, nothing emitted)
+#   forecast_fit      ForecastModel.fit on the daily net matrix
+#   forecast          ForecastModel.horizons (7/30/90 day projections)
+#
+# With --repeat N each scale runs N times and every stage keeps its best
+# time. Results are written as JSON (--out) together with the commit, Python
+# and NumPy versions. --compare takes an earlier results file, prints the
+# per-stage ratio and exits 1 if any stage is slower than --tolerance allows.
+#
+#   python3 benchmark_suite.py --scales 1K 100K --repeat 3 --out bench-$(git rev-parse --short HEAD).json
+#   python3 benchmark_suite.py --scales 1K 100K --repeat 3 --compare bench-abc1234.json
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from cashflow_forecast import ForecastModel
+from cashflow_series import PERIOD_DAYS
+from columnar_store import ColumnarStore
+from insight_rules import InsightEngine
+from rollup_index import RollupIndex
+from synthetic_business import generate, iter_events, scheduled_occurrences
+from transaction_ingest import TransactionIngest
+
+SCALES = {'1K': 1_000, '100K': 100_000, '10M': 10_000_000}
+INGEST_LIMIT = 1_000_000
+DEFAULT_TOLERANCE = 0.15
+# Stages under this many seconds are too noisy to flag as regressions
+MIN_COMPARABLE_SECONDS = 0.01
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name, items):
+        start = time.perf_counter()
+        yield
+        seconds = time.perf_counter() - start
+        self.stages[name] = {'seconds': round(seconds, 6), 'items': int(items),
+                             'items_per_second': round(items / seconds, 1) if seconds else None}
+
+
+def daily_net_matrix(txns):
+    """(n_accounts, days) net cents per account and day."""
+    n_accounts = txns['n_accounts']
+    days = txns['last_day'] - txns['first_day'] + 1
+    flat = txns['account'].astype(np.int64) * days + (txns['day'] - txns['first_day'])
+    net = np.bincount(flat, weights=txns['amount_cents'], minlength=n_accounts * days)
+    return net.reshape(n_accounts, days)
+
+
+def insight_book(txns, opening, net_dollars, seed):
+    """Insight engine columns for every account at the end of the history."""
+    n_accounts = txns['n_accounts']
+    balances = opening[:, None] + np.cumsum(net_dollars, axis=1)
+    account, _, amount, _ = scheduled_occurrences(txns['plan'], txns['last_day'] + 1, txns['last_day'] + 7)
+    rng = np.random.default_rng((seed, 2))
+    return {
+        'account_id': np.arange(n_accounts, dtype=np.int64),
+        'balance': balances[:, -1],
+        'savings_balance': rng.lognormal(10, 1, n_accounts),
+        'avg_daily_balance': balances[:, -30:].mean(axis=1),
+        'prev_avg_daily_balance': balances[:, -60:-30].mean(axis=1),
+        'upcoming_count_7d': np.bincount(account, minlength=n_accounts),
+        'upcoming_total_7d': np.bincount(account, weights=-amount, minlength=n_accounts) / 100,
+    }
+
+
+def run_scale(n_transactions, seed=0, ingest_limit=INGEST_LIMIT):
+    timer = StageTimer()
+    with timer.stage('generate', n_transactions):
+        txns = generate(n_transactions, seed=seed)
+    n_accounts = txns['n_accounts']
+    account_ids = [f'ACCT-{i:06d}' for i in range(n_accounts)]
+    rng = np.random.default_rng((seed, 3))
+    opening = rng.lognormal(10.8, 0.5, n_accounts).round(2)
+
+    ingested = min(ingest_limit, n_transactions)
+    ingest = TransactionIngest({i: int(v * 100) for i, v in enumerate(opening)})
+    with timer.stage('ingest', ingested):
+        ingest.run(iter_events(txns, ingested))
+
+    with timer.stage('daily_net', n_transactions):
+        net = daily_net_matrix(txns)
+    net_dollars = net / 100
+
+    with timer.stage('rollup_build', n_accounts):
+        indexes = [RollupIndex.from_daily_net(txns['first_day'], net_dollars[i], opening[i])
+                   for i in range(n_accounts)]
+    with timer.stage('chart_queries', n_accounts * len(PERIOD_DAYS)):
+        for index in indexes:
+            for period in PERIOD_DAYS:
+                index.query(period)
+
+    with tempfile.TemporaryDirectory(prefix='b360-bench-') as root:
+        with timer.stage('store_write', n_transactions):
+            ColumnarStore(root).write_batch(txns['account'], txns['day'], txns['amount_cents'], txns['category'])
+        store = ColumnarStore(root)
+        with timer.stage('store_queries', n_accounts * len(PERIOD_DAYS)):
+            for account in range(n_accounts):
+                for period in PERIOD_DAYS:
+                    store.period(account, period, txns['last_day'])
+
+    book = insight_book(txns, opening, net_dollars, seed)
+    engine = InsightEngine()
+    with timer.stage('insights', n_accounts):
+        engine.run(book)
+    with timer.stage('insights_repeat', n_accounts):
+        engine.run(book)
+
+    model = ForecastModel()
+    with timer.stage('forecast_fit', n_accounts):
+        model.fit(account_ids, txns['first_day'], net_dollars, book['balance'])
+    with timer.stage('forecast', n_accounts):
+        model.horizons()
+
+    return {'transactions': n_transactions, 'accounts': n_accounts, 'stages': timer.stages}
+
+
+def best_of(runs):
+    """Merge repeated run_scale results, keeping each stage's fastest run."""
+    best = dict(runs[0], stages=dict(runs[0]['stages']))
+    for run in runs[1:]:
+        for name, stage in run['stages'].items():
+            if stage['seconds'] < best['stages'][name]['seconds']:
+                best['stages'][name] = stage
+    best['repeat'] = len(runs)
+    return best
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Print per-stage time ratios against a baseline; returns the (scale, stage) pairs that regressed."""
+    regressions = []
+    print(f"  comparing with {(baseline.get('commit') or 'baseline')[:12]}")
+    print(f"  {'scale':<6}{'stage':<18}{'base s':>12}{'now s':>12}{'ratio':>8}")
+    for scale, result in current['scales'].items():
+        base_stages = baseline['scales'].get(scale, {}).get('stages', {})
+        for name, stage in result['stages'].items():
+            base = base_stages.get(name)
+            if base is None:
+                continue
+            ratio = stage['seconds'] / base['seconds'] if base['seconds'] else float('inf')
+            regressed = ratio > 1 + tolerance and stage['seconds'] >= MIN_COMPARABLE_SECONDS
+            if regressed:
+                regressions.append((scale, name))
+            print(f"  {scale:<6}{name:<18}{base['seconds']:>12.4f}{stage['seconds']:>12.4f}{ratio:>8.2f}"
+                  + ('  REGRESSION' if regressed else ''))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the data backend on synthetic business data')
+    parser.add_argument('--scales', nargs='+', default=['1K', '100K'], choices=list(SCALES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ingest-limit', type=int, default=INGEST_LIMIT,
+                        help='rows fed through the row-at-a-time ingest stage')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per scale; each stage keeps its best time')
+    parser.add_argument('--out', help='write results JSON here')
+    parser.add_argument('--compare', help='earlier results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed slowdown per stage before --compare fails (0.15 = 15%%)')
+    args = parser.parse_args()
+
+    results = {
+        'commit': git_commit(),
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.platform(),
+        'cpus': os.cpu_count(),
+        'seed': args.seed,
+        'scales': {},
+    }
+
+    print('Backend benchmark suite')
+    print('=' * 100)
+    for scale in args.scales:
+        result = results['scales'][scale] = best_of([run_scale(SCALES[scale], args.seed, args.ingest_limit)
+                                                         for _ in range(args.repeat)])
+        print(f"  {scale}: {result['transactions']:,} transactions, {result['accounts']:,} accounts")
+        for name, stage in result['stages'].items():
+            print(f"    {name:<18}{stage['seconds']:>10.4f}s {stage['items']:>12,} items "
+                  f"{stage['items_per_second'] or 0:>14,.0f}/s")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'  results written to {args.out}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            sys.exit(1)
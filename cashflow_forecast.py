@@ -0,0 +1,257 @@
+# Batched cash flow forecasting for the AI Forecasting Card
+# ("7-30 day ML-powered cash flow predictions").
+#
+# Replaces the `currentCash + random` projections in generatePulseLabsData.
+# Each account's daily net flow is modelled with additive seasonal
+# exponential smoothing (level + day-of-week season). Accounts are stacked
+# into (n_accounts, days) arrays and every smoothing step runs for all of
+# them at once; the smoothing constants are picked per account from a small
+# grid that is evaluated in the same pass. Balance forecasts are the last
+# balance plus the cumulative forecast flows, so 7, 30 and 90 day horizons
+# all come from one fit. Fitted state is kept per account and rolled forward
+# day by day as new flows arrive, without refitting.
+
+import argparse
+import time
+
+import numpy as np
+
+from cashflow_series import CHUNK_ACCOUNTS
+
+HORIZONS = (7, 30, 90)
+ALPHAS = (0.02, 0.05, 0.1, 0.2, 0.4)
+GAMMAS = (0.02, 0.1, 0.3)
+SEASON = 7
+# z-score for the 80% band shown around the projection
+BAND_Z = 1.2816
+
+
+def weekday(day):
+    # Monday == 0; day is days since 1970-01-01 (a Thursday)
+    return (np.asarray(day) + 3) % SEASON
+
+
+def _initial_state(y, first_day):
+    """Level from the first two weeks, season as mean deviation per weekday."""
+    warmup = min(y.shape[1], 2 * SEASON)
+    level = y[:, :warmup].mean(axis=1)
+    season = np.zeros((y.shape[0], SEASON))
+    for offset in range(min(warmup, SEASON)):
+        cols = y[:, offset:warmup:SEASON]
+        season[:, weekday(first_day + offset)] = cols.mean(axis=1) - level
+    return level, season
+
+
+def _smooth(y, first_day, level, season, alpha, gamma):
+    """
+    Run the smoothing recursion over y (n, days) in place on level/season.
+
+    first_day may be a scalar or one day per row; alpha and gamma are per-row
+    arrays. Returns the sum of squared one-step errors per row and the
+    number of steps.
+    """
+    rows = np.arange(y.shape[0])
+    first_wd = np.broadcast_to(weekday(first_day), rows.shape)
+    sse = np.zeros(y.shape[0])
+    for t in range(y.shape[1]):
+        wd = (first_wd + t) % SEASON
+        s = season[rows, wd]
+        err = y[:, t] - (level + s)
+        sse += err * err
+        new_level = level + alpha * err
+        season[rows, wd] = s + gamma * (y[:, t] - new_level - s)
+        level[:] = new_level
+    return sse, y.shape[1]
+
+
+class ForecastModel:
+    """Per-account smoothing state for many accounts, stored as stacked arrays."""
+
+    def __init__(self):
+        self.rows = {}
+        self.account_ids = []
+        self.level = np.empty(0)
+        self.season = np.empty((0, SEASON))
+        self.alpha = np.empty(0)
+        self.gamma = np.empty(0)
+        self.sigma2 = np.empty(0)
+        self.observations = np.empty(0, dtype=np.int64)
+        self.balance = np.empty(0)
+        self.last_day = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.account_ids)
+
+    def _row_indices(self, account_ids):
+        try:
+            return np.fromiter((self.rows[a] for a in account_ids), dtype=np.int64, count=len(account_ids))
+        except KeyError as exc:
+            raise KeyError(f'account {exc.args[0]!r} has not been fitted') from None
+
+    def fit(self, account_ids, first_day, daily_net, balances):
+        """
+        Fit (or refit) accounts from a contiguous history.
+
+        daily_net is (n_accounts, days) starting at first_day (days since
+        epoch); balances are the balances at the end of that history.
+        """
+        y = np.asarray(daily_net, dtype=np.float64)
+        n, days = y.shape
+        if days < 2 * SEASON:
+            raise ValueError(f'need at least {2 * SEASON} days of history to fit')
+
+        grid = [(a, g) for a in ALPHAS for g in GAMMAS]
+        fitted = {
+            'level': np.empty(n),
+            'season': np.empty((n, SEASON)),
+            'alpha': np.empty(n),
+            'gamma': np.empty(n),
+            'sigma2': np.empty(n),
+        }
+        # Evaluate every (alpha, gamma) pair in one stacked pass per chunk of
+        # accounts, so the len(grid) copies of the history stay bounded
+        for start in range(0, n, CHUNK_ACCOUNTS):
+            stop = min(start + CHUNK_ACCOUNTS, n)
+            chunk = y[start:stop]
+            rows = stop - start
+            level0, season0 = _initial_state(chunk, first_day)
+            level = np.tile(level0, len(grid))
+            season = np.tile(season0, (len(grid), 1))
+            alpha = np.repeat([a for a, _ in grid], rows)
+            gamma = np.repeat([g for _, g in grid], rows)
+            sse, steps = _smooth(np.tile(chunk, (len(grid), 1)), first_day, level, season, alpha, gamma)
+
+            best = np.argmin(sse.reshape(len(grid), rows), axis=0)
+            pick = best * rows + np.arange(rows)
+            fitted['level'][start:stop] = level[pick]
+            fitted['season'][start:stop] = season[pick]
+            fitted['alpha'][start:stop] = alpha[pick]
+            fitted['gamma'][start:stop] = gamma[pick]
+            fitted['sigma2'][start:stop] = sse[pick] / steps
+
+        self._store(account_ids, {
+            **fitted,
+            'observations': np.full(n, days, dtype=np.int64),
+            'balance': np.asarray(balances, dtype=np.float64),
+            'last_day': np.full(n, first_day + days - 1, dtype=np.int64),
+        })
+
+    def _store(self, account_ids, state):
+        new = [a for a in account_ids if a not in self.rows]
+        if new:
+            start = len(self.account_ids)
+            for offset, account in enumerate(new):
+                self.rows[account] = start + offset
+            self.account_ids.extend(new)
+            grow = len(new)
+            self.level = np.concatenate((self.level, np.zeros(grow)))
+            self.season = np.concatenate((self.season, np.zeros((grow, SEASON))))
+            self.alpha = np.concatenate((self.alpha, np.zeros(grow)))
+            self.gamma = np.concatenate((self.gamma, np.zeros(grow)))
+            self.sigma2 = np.concatenate((self.sigma2, np.zeros(grow)))
+            self.observations = np.concatenate((self.observations, np.zeros(grow, dtype=np.int64)))
+            self.balance = np.concatenate((self.balance, np.zeros(grow)))
+            self.last_day = np.concatenate((self.last_day, np.zeros(grow, dtype=np.int64)))
+
+        idx = self._row_indices(account_ids)
+        for name, values in state.items():
+            getattr(self, name)[idx] = values
+
+    def update(self, account_ids, daily_net):
+        """
+        Roll fitted accounts forward by new days (n, k) that follow each
+        account's last fitted day. Smoothing constants are kept as fitted.
+        """
+        idx = self._row_indices(account_ids)
+        y = np.asarray(daily_net, dtype=np.float64)
+        if y.ndim == 1:
+            y = y[:, None]
+
+        level = self.level[idx]
+        season = self.season[idx]
+        sse, steps = _smooth(y, self.last_day[idx] + 1, level, season, self.alpha[idx], self.gamma[idx])
+
+        n_obs = self.observations[idx]
+        self.sigma2[idx] = (self.sigma2[idx] * n_obs + sse) / (n_obs + steps)
+        self.observations[idx] = n_obs + steps
+        self.level[idx] = level
+        self.season[idx] = season
+        self.balance[idx] += y.sum(axis=1)
+        self.last_day[idx] += steps
+
+    def forecast(self, account_ids=None, horizon=max(HORIZONS)):
+        """
+        Balance projection for the next `horizon` days.
+
+        Returns {'first_day', 'balance', 'lower', 'upper', 'flow'} with
+        (n, horizon) arrays; first_day is per account.
+        """
+        idx = np.arange(len(self)) if account_ids is None else self._row_indices(account_ids)
+        steps = np.arange(1, horizon + 1)
+        future_days = self.last_day[idx, None] + steps
+        flow = self.level[idx, None] + np.take_along_axis(self.season[idx], weekday(future_days), axis=1)
+        balance = self.balance[idx, None] + np.cumsum(flow, axis=1)
+        spread = BAND_Z * np.sqrt(self.sigma2[idx, None] * steps)
+        return {
+            'first_day': self.last_day[idx] + 1,
+            'flow': flow,
+            'balance': balance,
+            'lower': balance - spread,
+            'upper': balance + spread,
+        }
+
+    def horizons(self, account_ids=None, horizons=HORIZONS):
+        """7/30/90 day views sliced from a single projection."""
+        full = self.forecast(account_ids, max(horizons))
+        views = {}
+        for h in horizons:
+            views[h] = {
+                'first_day': full['first_day'],
+                **{key: full[key][:, :h] for key in ('flow', 'balance', 'lower', 'upper')},
+            }
+        return views
+
+
+def synthetic_flows(n_accounts, days, seed=0):
+    """Daily net flows with a weekday pattern and weekend dips."""
+    rng = np.random.default_rng(seed)
+    pattern = np.array([1.2, 1.0, 1.0, 1.1, 1.4, -0.3, -0.4])
+    scale = rng.lognormal(6.5, 0.5, n_accounts)[:, None]
+    first_day = int(np.datetime64('2024-01-01', 'D').astype('int64'))
+    wd = weekday(first_day + np.arange(days))
+    flows = scale * (pattern[wd] + rng.normal(0, 1.5, (n_accounts, days)))
+    return first_day, flows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark batched cash flow forecasting')
+    parser.add_argument('--accounts', type=int, default=10000)
+    parser.add_argument('--days', type=int, default=365)
+    args = parser.parse_args()
+
+    first_day, flows = synthetic_flows(args.accounts, args.days + 1)
+    account_ids = [f'PNC-{i:06d}' for i in range(args.accounts)]
+    model = ForecastModel()
+
+    start = time.perf_counter()
+    model.fit(account_ids, first_day, flows[:, :-1], np.full(args.accounts, 42350.0))
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model.update(account_ids, flows[:, -1:])
+    update_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    views = model.horizons()
+    forecast_seconds = time.perf_counter() - start
+
+    print('Cash flow forecast benchmark')
+    print('=' * 100)
+    print(f'  accounts x days:  {args.accounts:,} x {args.days}')
+    print(f'  fit ({len(ALPHAS) * len(GAMMAS)} param sets): {fit_seconds:.2f}s '
+          f'({args.accounts / fit_seconds:,.0f} accounts/s)')
+    print(f'  one-day update:   {update_seconds * 1000:.1f}ms')
+    print(f'  7/30/90 forecast: {forecast_seconds * 1000:.1f}ms')
+    print(f'  sample 30-day balance for {account_ids[0]}: '
+          f'${views[30]["balance"][0, -1]:,.0f} '
+          f'(${views[30]["lower"][0, -1]:,.0f} - ${views[30]["upper"][0, -1]:,.0f})')
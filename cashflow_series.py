@@ -0,0 +1,194 @@
+# Cash Flow Graph series engine for the Business 360 hero chart.
+#
+# Python port of generateChartData(period) in script.js. The browser version
+# walks one day at a time (Math.random step, weekend damping, recent upward
+# trend); here the same shape is produced for whole batches of accounts at
+# once with NumPy: one random matrix, a weekend mask, a trend vector and a
+# cumulative sum along the day axis.
+
+import argparse
+import datetime
+import random
+import time
+
+import numpy as np
+
+# Time Period Selector pills -> number of days shown.
+PERIOD_DAYS = {
+    '7D': 7,
+    '30D': 30,
+    '90D': 90,
+    '1Y': 365,
+    'All': 730,
+}
+
+# Defaults taken from generateChartData in script.js
+BASE_VALUE = 42350
+VOLATILITY = 5000
+TREND_STEP = 1000
+TREND_FRACTION = 0.3
+WEEKEND_FACTOR = 0.7
+
+# Accounts processed per chunk, keeps the float64 scratch matrix bounded
+CHUNK_ACCOUNTS = 4096
+
+
+def period_days(period):
+    """Accept a pill label ('30D') or a day count (30) and return the day count."""
+    if isinstance(period, str):
+        if period in PERIOD_DAYS:
+            return PERIOD_DAYS[period]
+        period = int(period)
+    if period <= 0:
+        raise ValueError('period must be a positive number of days')
+    return int(period)
+
+
+def period_dates(period, end_date=None):
+    """Return the datetime64[D] dates covered by a period, oldest first."""
+    days = period_days(period)
+    end = np.datetime64(end_date or datetime.date.today(), 'D')
+    return end - np.arange(days - 1, -1, -1)
+
+
+def weekend_mask(dates):
+    """True for Saturdays and Sundays."""
+    # 1970-01-01 was a Thursday, so (day + 3) % 7 gives Monday == 0
+    weekday = (dates.astype('int64') + 3) % 7
+    return weekday >= 5
+
+
+def trend_vector(days):
+    """Per-day trend step: +TREND_STEP on the most recent 30% of the period."""
+    remaining = np.arange(days - 1, -1, -1)
+    return np.where(remaining < days * TREND_FRACTION, TREND_STEP, 0.0)
+
+
+def period_labels(dates, period):
+    """Axis labels formatted the way generateChartData formats them."""
+    days = period_days(period)
+    if days <= 7:
+        fmt = '%a'
+    elif days <= 30:
+        fmt = '%b %-d'
+    else:
+        fmt = '%b'
+    return [d.strftime(fmt) for d in dates.astype(datetime.date)]
+
+
+def balance_series(opening, daily_net):
+    """Running balances from opening balances (n,) and daily net flows (n, days)."""
+    daily_net = np.asarray(daily_net)
+    return np.asarray(opening)[..., None] + np.cumsum(daily_net, axis=-1)
+
+
+def generate_series(n_accounts, period, end_date=None, base_values=BASE_VALUE,
+                    volatility=VOLATILITY, seed=None, out=None):
+    """
+    Simulated balance series for many accounts in one call.
+
+    Returns (dates, values) where values is an int64 array shaped
+    (n_accounts, days). base_values and volatility may be scalars or
+    per-account arrays.
+    """
+    dates = period_dates(period, end_date)
+    days = len(dates)
+    rng = np.random.default_rng(seed)
+
+    base_values = np.broadcast_to(np.asarray(base_values, dtype=np.float64), (n_accounts,))
+    volatility = np.broadcast_to(np.asarray(volatility, dtype=np.float64), (n_accounts,))
+
+    # Weekend damping only applies to the random part, the trend is added after
+    day_scale = np.where(weekend_mask(dates), WEEKEND_FACTOR, 1.0) * 0.4
+    trend = trend_vector(days)
+
+    if out is None:
+        out = np.empty((n_accounts, days), dtype=np.int64)
+
+    for start in range(0, n_accounts, CHUNK_ACCOUNTS):
+        stop = min(start + CHUNK_ACCOUNTS, n_accounts)
+        steps = rng.random((stop - start, days))
+        steps -= 0.5
+        steps *= day_scale
+        steps *= volatility[start:stop, None]
+        steps += trend
+        np.cumsum(steps, axis=1, out=steps)
+        steps += base_values[start:stop, None]
+        np.rint(steps, out=steps)
+        out[start:stop] = steps
+
+    return dates, out
+
+
+def chart_payload(period, values, end_date=None):
+    """{labels, values} for one account, the same shape the chart consumes."""
+    dates = period_dates(period, end_date)
+    return {
+        'labels': period_labels(dates, period),
+        'values': [int(v) for v in values],
+    }
+
+
+def generate_series_loop(n_accounts, period, end_date=None, base_value=BASE_VALUE,
+                         volatility=VOLATILITY, seed=None):
+    """Straight per-account, per-day port of the JavaScript loop (benchmark baseline)."""
+    days = period_days(period)
+    end = end_date or datetime.date.today()
+    rnd = random.Random(seed)
+    series = []
+    for _ in range(n_accounts):
+        value = base_value
+        values = []
+        for i in range(days - 1, -1, -1):
+            date = end - datetime.timedelta(days=i)
+            change = (rnd.random() - 0.5) * volatility * 0.4
+            factor = WEEKEND_FACTOR if date.weekday() >= 5 else 1
+            value += change * factor
+            if i < days * TREND_FRACTION:
+                value += TREND_STEP
+            values.append(round(value))
+        series.append(values)
+    return series
+
+
+def benchmark(n_accounts, period, loop_accounts):
+    days = period_days(period)
+
+    start = time.perf_counter()
+    generate_series_loop(loop_accounts, days, seed=1)
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    generate_series(n_accounts, days, seed=1)
+    vector_seconds = time.perf_counter() - start
+
+    loop_rate = loop_accounts / loop_seconds
+    vector_rate = n_accounts / vector_seconds
+    return {
+        'period_days': days,
+        'loop_accounts': loop_accounts,
+        'loop_accounts_per_sec': loop_rate,
+        'vector_accounts': n_accounts,
+        'vector_accounts_per_sec': vector_rate,
+        'speedup': vector_rate / loop_rate,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the batched cash flow series engine')
+    parser.add_argument('--accounts', type=int, default=50000)
+    parser.add_argument('--loop-accounts', type=int, default=500)
+    parser.add_argument('--period', default='all', help='7D, 30D, 90D, 1Y, All or "all" for every pill')
+    args = parser.parse_args()
+
+    periods = list(PERIOD_DAYS) if args.period == 'all' else [args.period]
+
+    print('Cash Flow Graph series benchmark')
+    print('=' * 100)
+    print(f"{'Period':<8}{'Days':>6}{'Loop acct/s':>16}{'Vector acct/s':>18}{'Speedup':>10}")
+    for period in periods:
+        result = benchmark(args.accounts, period, args.loop_accounts)
+        print(f"{period:<8}{result['period_days']:>6}"
+              f"{result['loop_accounts_per_sec']:>16,.0f}"
+              f"{result['vector_accounts_per_sec']:>18,.0f}"
+              f"{result['speedup']:>9.1f}x")
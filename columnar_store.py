@@ -0,0 +1,233 @@
+# Memory-mapped columnar transaction store for chart period queries.
+#
+# Transactions are partitioned by account and kept sorted by day, one
+# fixed-width raw column file per field:
+#
+#   <root>/<account>/day.<gen>.i4        days since 1970-01-01
+#   <root>/<account>/amount.<gen>.i8     signed cents
+#   <root>/<account>/category.<gen>.u2   category id
+#   <root>/<account>/account.<gen>.u4    numeric account id
+#   <root>/<account>/manifest.json       {"generation", "rows", "account_id"}
+#
+# Opening a partition maps the files (np.memmap) and reads nothing else, so
+# a worker's cold start does not depend on history size and only the pages a
+# query touches become resident. A period query binary-searches the day
+# column and returns slices of the maps, i.e. zero-copy views. Appends that
+# keep day order are written to the end of the current files; anything else
+# rewrites the partition as a new generation. The manifest is replaced
+# atomically last, so readers never see a half-written batch.
+
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from cashflow_series import period_days
+from rollup_index import to_day
+
+COLUMNS = {
+    'day': np.dtype('<i4'),
+    'amount': np.dtype('<i8'),
+    'category': np.dtype('<u2'),
+    'account': np.dtype('<u4'),
+}
+EXTENSIONS = {'day': 'i4', 'amount': 'i8', 'category': 'u2', 'account': 'u4'}
+OPEN_PARTITIONS = 1024
+
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+class Partition:
+    """One account's columns, memory-mapped read-only."""
+
+    def __init__(self, path, manifest):
+        self.path = path
+        self.generation = manifest['generation']
+        self.rows = manifest['rows']
+        self.account_id = manifest['account_id']
+        self.columns = {}
+        for name, dtype in COLUMNS.items():
+            if self.rows:
+                self.columns[name] = np.memmap(column_path(path, name, self.generation), dtype=dtype,
+                                               mode='r', shape=(self.rows,))
+            else:
+                self.columns[name] = np.empty(0, dtype=dtype)
+
+    def __len__(self):
+        return self.rows
+
+    def slice(self, first_day, last_day):
+        """Views of every column for first_day <= day <= last_day."""
+        days = self.columns['day']
+        lo = int(np.searchsorted(days, first_day, side='left'))
+        hi = int(np.searchsorted(days, last_day, side='right'))
+        return {name: column[lo:hi] for name, column in self.columns.items()}
+
+
+def column_path(path, name, generation):
+    return os.path.join(path, f'{name}.{generation}.{EXTENSIONS[name]}')
+
+
+def _write_json_atomic(path, payload):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp, path)
+
+
+class ColumnarStore:
+    def __init__(self, root, max_open=OPEN_PARTITIONS):
+        self.root = root
+        self.max_open = max_open
+        self._open = OrderedDict()
+        os.makedirs(root, exist_ok=True)
+
+    def _partition_dir(self, account):
+        return os.path.join(self.root, _SAFE_NAME.sub('_', str(account)))
+
+    def _read_manifest(self, path):
+        try:
+            with open(os.path.join(path, 'manifest.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def partition(self, account):
+        """The account's partition (cached), or None if nothing was written for it."""
+        path = self._partition_dir(account)
+        manifest = self._read_manifest(path)
+        if manifest is None:
+            return None
+        cached = self._open.get(account)
+        if cached is not None and cached.generation == manifest['generation'] \
+                and cached.rows == manifest['rows']:
+            self._open.move_to_end(account)
+            return cached
+        part = Partition(path, manifest)
+        self._open[account] = part
+        self._open.move_to_end(account)
+        while len(self._open) > self.max_open:
+            self._open.popitem(last=False)
+        return part
+
+    def query(self, account, first_day, last_day):
+        part = self.partition(account)
+        if part is None:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        return part.slice(to_day(first_day), to_day(last_day))
+
+    def period(self, account, period, end_day=None):
+        """Zero-copy column views for a period pill ending at end_day (default: last day stored)."""
+        part = self.partition(account)
+        if part is None or not len(part):
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        end = int(part.columns['day'][-1]) if end_day is None else to_day(end_day)
+        # 'All' is PERIOD_DAYS['All'] like every other pill; query() reads arbitrary ranges
+        return part.slice(end - period_days(period) + 1, end)
+
+    def append(self, account, account_id, days, amounts, categories):
+        """Add transactions for one account; returns the partition's new row count."""
+        days = np.asarray(days, dtype=COLUMNS['day'])
+        order = np.argsort(days, kind='stable')
+        new = {
+            'day': days[order],
+            'amount': np.asarray(amounts, dtype=COLUMNS['amount'])[order],
+            'category': np.asarray(categories, dtype=COLUMNS['category'])[order],
+            'account': np.full(len(days), account_id, dtype=COLUMNS['account']),
+        }
+        path = self._partition_dir(account)
+        os.makedirs(path, exist_ok=True)
+        manifest = self._read_manifest(path) or {'generation': 0, 'rows': 0, 'account_id': account_id}
+        generation, rows = manifest['generation'], manifest['rows']
+
+        last_day = None
+        if rows:
+            last_day = int(np.memmap(column_path(path, 'day', generation), dtype=COLUMNS['day'],
+                                     mode='r', offset=(rows - 1) * COLUMNS['day'].itemsize, shape=(1,))[0])
+
+        if not rows or not len(days) or new['day'][0] >= last_day:
+            # In order: extend the current generation in place
+            for name, values in new.items():
+                filename = column_path(path, name, generation)
+                with open(filename, 'r+b' if os.path.exists(filename) else 'wb') as f:
+                    f.seek(rows * COLUMNS[name].itemsize)
+                    f.truncate()
+                    f.write(values.tobytes())
+            rows += len(days)
+        else:
+            # Out of order: merge into a fresh generation, then drop the old files
+            old = Partition(path, manifest).columns
+            merged_days = np.concatenate((old['day'], new['day']))
+            order = np.argsort(merged_days, kind='stable')
+            generation += 1
+            for name in COLUMNS:
+                np.concatenate((old[name], new[name]))[order].tofile(column_path(path, name, generation))
+            del old
+            rows += len(days)
+
+        _write_json_atomic(os.path.join(path, 'manifest.json'),
+                           {'generation': generation, 'rows': rows, 'account_id': account_id})
+        if generation != manifest['generation']:
+            for name in COLUMNS:
+                try:
+                    os.remove(column_path(path, name, manifest['generation']))
+                except FileNotFoundError:
+                    pass
+        return rows
+
+    def write_batch(self, account_ids, days, amounts, categories, names=None):
+        """Append a mixed batch, grouped into one append per account."""
+        account_ids = np.asarray(account_ids)
+        order = np.argsort(account_ids, kind='stable')
+        sorted_ids = account_ids[order]
+        starts = np.flatnonzero(np.concatenate(([True], sorted_ids[1:] != sorted_ids[:-1])))
+        ends = np.concatenate((starts[1:], [len(sorted_ids)]))
+        days, amounts, categories = np.asarray(days), np.asarray(amounts), np.asarray(categories)
+        for lo, hi in zip(starts, ends):
+            rows = order[lo:hi]
+            account_id = int(sorted_ids[lo])
+            name = names[account_id] if names is not None else account_id
+            self.append(name, account_id, days[rows], amounts[rows], categories[rows])
+
+    def write_table(self, table):
+        """Append every row of a transaction_records.TransactionTable, partitioned by account name."""
+        data = table.data
+        self.write_batch(data['account'], data['day'], data['cents'], data['category'], names=table.accounts.values)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build a sample store and time cold period queries')
+    parser.add_argument('root', help='store directory')
+    parser.add_argument('--accounts', type=int, default=200)
+    parser.add_argument('--transactions', type=int, default=5000, help='per account')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    end = to_day('2025-11-01')
+    start = time.perf_counter()
+    n = args.accounts * args.transactions
+    ColumnarStore(args.root).write_batch(
+        rng.integers(0, args.accounts, n),
+        end - rng.integers(0, 3 * 365, n),
+        rng.normal(0, 150_000, n).astype(np.int64),
+        rng.integers(0, 20, n),
+    )
+    build_seconds = time.perf_counter() - start
+
+    store = ColumnarStore(args.root)
+    timings = {}
+    for period in ('7D', '30D', '90D', '1Y', 'All'):
+        start = time.perf_counter()
+        rows = sum(len(store.period(account, period, end)['day']) for account in range(args.accounts))
+        timings[period] = (time.perf_counter() - start, rows)
+
+    print('Columnar store')
+    print('=' * 100)
+    print(f'  wrote {n:,} transactions for {args.accounts:,} accounts in {build_seconds:.2f}s')
+    for period, (seconds, rows) in timings.items():
+        print(f'  {period:<4} {seconds / args.accounts * 1e6:>8.1f}us/account  {rows:>12,} rows viewed')
@@ -0,0 +1,477 @@
+# Asyncio JSON API for the Business 360 dashboard.
+#
+# Replaces `python3 -m http.server 8000` for local development: static files
+# are still served from the project root, and /api/* returns the data the
+# page otherwise simulates in the browser:
+#
+#   GET /api/series?account=PNC-0001&period=30D   Cash Flow Graph series
+#   GET /api/insights?account=PNC-0001            Generic Insight Cards
+#   GET /api/balances?account=PNC-0001            Real-Time Balance Card (optional &client=)
+#   GET /api/features                             feature catalog (script.py)
+#   GET /api/stream?account=PNC-0001              insight/balance/badge deltas (Server-Sent Events)
+#   GET /api/profile?stage=series&tenant=PNC-0001 cProfile the next call of a stage (--profile-endpoint)
+#   GET /metrics                                  per-stage timings (Prometheus text)
+#
+# Identical requests that arrive while one is already being computed share
+# its result instead of recomputing (request coalescing). Balances come from
+# an upstream bank API - here a local stand-in started with --stub-bank -
+# through a bounded pool of keep-alive connections, behind a
+# balance_cache.BalanceCache: a card read is served from the cache (stale
+# entries while a refresh runs in the background) and due refreshes are sent
+# as one batched request per bank. With --metrics every
+# request and the series/balances/insights stages behind it are timed with
+# stage_metrics, per account as the tenant. Every balances and insights
+# result is also diffed into a push_channel.PushBus; accounts with an open
+# stream are refreshed every --push-interval seconds so their subscribers
+# receive only what changed.
+
+import argparse
+import asyncio
+import csv
+import functools
+import json
+import logging
+import mimetypes
+import os
+import random
+import zlib
+from urllib.parse import parse_qs, quote, urlsplit
+
+import numpy as np
+
+from balance_cache import BATCH_WINDOW, MAX_ENTRIES, STALE_TTL, TTL, BalanceCache
+from cashflow_series import PERIOD_DAYS, chart_payload, generate_series
+from insight_rules import InsightEngine
+from push_channel import PushBus, stream
+from stage_metrics import REGISTRY as METRICS, request_profile, stage
+
+LOG = logging.getLogger('dashboard_server')
+ROOT = os.path.dirname(os.path.abspath(__file__))
+REAL_ROOT = os.path.realpath(ROOT)
+FEATURE_CSV = os.path.join(ROOT, 'business_360_feature_specification.csv')
+
+UPSTREAM_POOL_SIZE = 8
+UPSTREAM_TIMEOUT = 5.0
+STUB_BANK_LATENCY = 0.02
+METRICS_INTERVAL = 15.0
+PUSH_INTERVAL = 5.0
+DEFAULT_CLIENT = 'dashboard'
+# Request metrics are labelled by route; any other /api/ path shares one stage
+API_ROUTES = ('/api/series', '/api/insights', '/api/balances', '/api/features', '/api/profile')
+PROFILE_STAGES = ('series', 'balances.upstream', 'insights.rules') + tuple(f'request{r}' for r in API_ROUTES)
+MAX_PROFILE_COUNT = 20
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error', 502: 'Bad Gateway'}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+async def read_request(reader):
+    """(method, target, headers) of the next request on a connection, or None at EOF."""
+    line = await reader.readline()
+    if not line:
+        return None
+    method, target, _ = line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if length:
+        await reader.readexactly(length)
+    return method, target, headers
+
+
+async def read_response(reader):
+    """(status, headers, body) of one HTTP/1.1 response with a Content-Length."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed by peer')
+    status = int(status_line.split(b' ', 2)[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers, body
+
+
+def write_response(writer, status, body, content_type='application/json', keep_alive=True):
+    head = (f'HTTP/1.1 {status} {REASONS.get(status, "")}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n')
+    writer.write(head.encode('latin-1') + body)
+
+
+class Coalescer:
+    """Runs one computation per key at a time; concurrent callers await the same future."""
+
+    def __init__(self):
+        self.in_flight = {}
+        self.computed = 0
+        self.coalesced = 0
+
+    async def run(self, key, factory):
+        future = self.in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        future = asyncio.ensure_future(factory())
+        future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        self.in_flight[key] = future
+        self.computed += 1
+        return await asyncio.shield(future)
+
+
+class UpstreamPool:
+    """At most `size` keep-alive connections to one upstream host, reused across requests."""
+
+    def __init__(self, host, port, size=UPSTREAM_POOL_SIZE, timeout=UPSTREAM_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(size)
+        self._idle = []
+        self.opened = 0
+        self.requests = 0
+
+    async def get_json(self, path):
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else None
+            for attempt in range(2):
+                if conn is None:
+                    conn = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+                    self.opened += 1
+                reader, writer = conn
+                try:
+                    writer.write(f'GET {path} HTTP/1.1\r\nHost: {self.host}\r\n\r\n'.encode('latin-1'))
+                    status, _, body = await asyncio.wait_for(read_response(reader), self.timeout)
+                except asyncio.TimeoutError:
+                    writer.close()
+                    raise
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    # Idle connection went away; retry once on a fresh one
+                    writer.close()
+                    conn = None
+                    if attempt:
+                        raise
+                    continue
+                self.requests += 1
+                self._idle.append(conn)
+                if status != 200:
+                    raise HttpError(502, f'upstream returned {status}')
+                return json.loads(body)
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+def account_seed(account):
+    return zlib.crc32(account.encode('utf-8'))
+
+
+def account_series(account, period, end_date=None):
+    _, values = generate_series(1, period, end_date, seed=account_seed(account))
+    return chart_payload(period, values[0], end_date)
+
+
+def insight_cards(account, balances, end_date=None):
+    """Insight card payload for one account from its balances and last 60 days of history."""
+    _, history = generate_series(1, 60, end_date, seed=account_seed(account))
+    upcoming = balances.get('upcoming_payments', [])
+    book = {
+        'account_id': np.array([0]),
+        'balance': np.array([balances['balance']], dtype=np.float64),
+        'savings_balance': np.array([balances['savings_balance']], dtype=np.float64),
+        'avg_daily_balance': np.array([history[0, 30:].mean()]),
+        'prev_avg_daily_balance': np.array([history[0, :30].mean()]),
+        'upcoming_count_7d': np.array([len(upcoming)]),
+        'upcoming_total_7d': np.array([sum(p['amount'] for p in upcoming)], dtype=np.float64),
+    }
+    changes = InsightEngine().run(book)
+    return [{key: change[key] for key in ('rule', 'severity', 'card', 'message')} for change in changes]
+
+
+def stub_balances(account):
+    """Deterministic per-account balances served by the stub bank."""
+    rnd = random.Random(account_seed(account))
+    return {
+        'account': account,
+        'balance': round(rnd.uniform(2000, 90000), 2),
+        'savings_balance': round(rnd.uniform(0, 50000), 2),
+        'upcoming_payments': [{'amount': round(rnd.uniform(500, 8000), 2)}
+                              for _ in range(rnd.randrange(4))],
+    }
+
+
+def load_feature_catalog(path=FEATURE_CSV):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+class DashboardApi:
+    def __init__(self, upstream, balance_ttl=TTL, balance_stale_ttl=STALE_TTL, balance_cache_size=MAX_ENTRIES,
+                 batch_window=BATCH_WINDOW, profile_endpoint=False):
+        self.upstream = upstream
+        self.profile_endpoint = profile_endpoint
+        self.coalescer = Coalescer()
+        self.features = load_feature_catalog()
+        self.bus = PushBus(max_accounts=balance_cache_size)
+        self.balance_cache = BalanceCache(self._fetch_balances, balance_ttl, balance_stale_ttl, balance_cache_size,
+                                          batch_window, on_refresh=self._publish_balances)
+
+    async def handle(self, path, query):
+        if path == '/api/features':
+            return self.features
+        if path == '/api/profile':
+            if not self.profile_endpoint:
+                raise HttpError(404, 'profiling endpoint disabled (start with --profile-endpoint)')
+            name = query.get('stage', [None])[0]
+            if name not in PROFILE_STAGES:
+                raise HttpError(400, f'stage must be one of {", ".join(PROFILE_STAGES)}')
+            tenant = query.get('tenant', [None])[0]
+            count = query.get('count', ['1'])[0]
+            if not count.isdigit() or not 1 <= int(count) <= MAX_PROFILE_COUNT:
+                raise HttpError(400, f'count must be an integer from 1 to {MAX_PROFILE_COUNT}')
+            count = int(count)
+            try:
+                request_profile(name, tenant, count)
+            except ValueError as exc:
+                raise HttpError(400, str(exc)) from None
+            return {'stage': name, 'tenant': tenant, 'count': count, 'profile_dir': METRICS.profile_dir}
+        account = query.get('account', [None])[0]
+        if not account:
+            raise HttpError(400, 'account is required')
+        client = query.get('client', [DEFAULT_CLIENT])[0]
+
+        if path == '/api/series':
+            period = query.get('period', ['30D'])[0]
+            # Pill labels only: a free day count would let a client size the series
+            if period not in PERIOD_DAYS:
+                raise HttpError(400, f'unknown period {period!r}; expected one of {", ".join(PERIOD_DAYS)}')
+            return await self.coalescer.run(('series', account, period),
+                                            lambda: self._offload(self.series, account, period))
+        if path == '/api/balances':
+            return await self.coalescer.run(('balances', client, account), lambda: self.balances(account, client))
+        if path == '/api/insights':
+            return await self.coalescer.run(('insights', client, account), lambda: self.insights(account, client))
+        raise HttpError(404, f'no route for {path}')
+
+    async def _offload(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def series(self, account, period):
+        with stage('series', tenant=account) as s:
+            payload = account_series(account, period)
+            s.items = len(payload['values'])
+        return payload
+
+    async def balances(self, account, client=DEFAULT_CLIENT):
+        try:
+            payload, age = await self.balance_cache.get(client, account)
+        except KeyError as exc:
+            raise HttpError(502, exc.args[0]) from None
+        return dict(payload, updated_seconds_ago=round(age, 1))
+
+    async def _fetch_balances(self, bank, keys):
+        accounts = sorted({account for _, account in keys})
+        with stage('balances.upstream', tenant=bank, items=len(accounts)):
+            payloads = await self.upstream.get_json(f'/banks/{quote(bank)}/balances?accounts='
+                                                    + quote(','.join(accounts)))
+        return {key: payloads[key[1]] for key in keys if key[1] in payloads}
+
+    def _publish_balances(self, client, account, payload):
+        self.bus.publish_snapshot(account, 'balances', {k: v for k, v in payload.items() if k != 'account'})
+
+    async def insights(self, account, client=DEFAULT_CLIENT):
+        balances = await self.coalescer.run(('balances', client, account), lambda: self.balances(account, client))
+        with stage('insights.rules', tenant=account) as s:
+            cards = await self._offload(insight_cards, account, balances)
+            s.items = len(cards)
+        self.bus.publish_snapshot(account, 'insights', {card['rule']: card for card in cards})
+        return cards
+
+    async def refresh_subscribed(self, interval=PUSH_INTERVAL):
+        """Recompute insights (and so balances) for every account with an open stream."""
+        while True:
+            await asyncio.sleep(interval)
+            # Failures are left for the next round; subscribers just see no delta
+            await asyncio.gather(*(self.coalescer.run(('insights', DEFAULT_CLIENT, account),
+                                                      functools.partial(self.insights, account))
+                                   for account in self.bus.subscribed_accounts()), return_exceptions=True)
+
+
+async def serve_static(path):
+    relative = os.path.normpath(path.lstrip('/') or 'index.html')
+    # No dotfiles or dot-directories (.git, .env) and nothing that resolves outside ROOT
+    full = os.path.realpath(os.path.join(ROOT, relative))
+    if any(part.startswith('.') for part in relative.split(os.sep)) or \
+            os.path.commonpath([full, REAL_ROOT]) != REAL_ROOT or not os.path.isfile(full):
+        raise HttpError(404, f'{path} not found')
+    with open(full, 'rb') as f:
+        body = f.read()
+    return body, mimetypes.guess_type(full)[0] or 'application/octet-stream'
+
+
+def make_handler(api):
+    async def handle_connection(reader, writer):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                method, target, headers = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                url = urlsplit(target)
+                try:
+                    if method != 'GET':
+                        raise HttpError(405, f'{method} not allowed')
+                    if url.path == '/api/stream':
+                        account = parse_qs(url.query).get('account', [None])[0]
+                        if not account:
+                            raise HttpError(400, 'account is required')
+                        await stream(api.bus, account, reader, writer)
+                        break
+                    if url.path == '/metrics':
+                        body, content_type, status = render_metrics(api).encode('utf-8'), PROMETHEUS_CONTENT_TYPE, 200
+                    elif url.path.startswith('/api/'):
+                        query = parse_qs(url.query)
+                        route = url.path if url.path in API_ROUTES else '/api/unknown'
+                        with stage(f'request{route}', tenant=query.get('account', [None])[0]):
+                            payload = await api.handle(url.path, query)
+                        body, content_type, status = json.dumps(payload).encode('utf-8'), 'application/json', 200
+                    else:
+                        body, content_type = await serve_static(url.path)
+                        status = 200
+                except HttpError as exc:
+                    status, body, content_type = exc.status, json.dumps({'error': str(exc)}).encode('utf-8'), \
+                        'application/json'
+                except (OSError, asyncio.TimeoutError) as exc:
+                    status, body, content_type = 502, json.dumps({'error': str(exc)}).encode('utf-8'), \
+                        'application/json'
+                except Exception:
+                    LOG.exception('unhandled error serving %s', target)
+                    status, body, content_type = 500, json.dumps({'error': 'internal server error'}).encode('utf-8'), \
+                        'application/json'
+                write_response(writer, status, body, content_type, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+    return handle_connection
+
+
+def make_stub_bank(latency=STUB_BANK_LATENCY):
+    """Local stand-in for the connected bank APIs: balances for one account, or a batch of one bank's
+    accounts (/banks/<bank>/balances?accounts=A,B), after a fixed delay per request."""
+    async def handle_connection(reader, writer):
+        try:
+            while True:
+                request = await read_request(reader)
+                if request is None:
+                    break
+                _, target, _ = request
+                url = urlsplit(target)
+                parts = url.path.strip('/').split('/')
+                if len(parts) != 3 or parts[0] not in ('accounts', 'banks') or parts[2] != 'balances':
+                    write_response(writer, 404, b'{}')
+                    continue
+                await asyncio.sleep(latency)
+                if parts[0] == 'banks':
+                    accounts = parse_qs(url.query).get('accounts', [''])[0].split(',')
+                    payload = {account: stub_balances(account) for account in accounts if account}
+                else:
+                    payload = stub_balances(parts[1])
+                write_response(writer, 200, json.dumps(payload).encode('utf-8'))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+    return handle_connection
+
+
+def render_metrics(api):
+    """Prometheus text served at /metrics and written to --metrics-file: stage timings and balance cache."""
+    return METRICS.render_prometheus() + '\n'.join(api.balance_cache.prometheus_lines()) + '\n'
+
+
+async def write_metrics_periodically(api, path, interval):
+    while True:
+        await asyncio.sleep(interval)
+        METRICS.write_prometheus(path, render_metrics(api))
+
+
+async def main(args):
+    METRICS.configure(enabled=args.metrics or bool(args.metrics_file) or args.profile_endpoint or None,
+                      track_allocations=args.track_allocations or None,
+                      profile_rate=args.profile_rate, profile_dir=args.profile_dir)
+    servers = []
+    if args.stub_bank:
+        servers.append(await asyncio.start_server(make_stub_bank(), args.upstream_host, args.upstream_port))
+    pool = UpstreamPool(args.upstream_host, args.upstream_port, args.pool_size)
+    api = DashboardApi(pool, args.balance_ttl, args.balance_stale_ttl, args.balance_cache_size,
+                       args.balance_batch_window, args.profile_endpoint)
+    server = await asyncio.start_server(make_handler(api), args.host, args.port)
+    servers.append(server)
+    print(f'Business 360 API on http://{args.host}:{args.port} '
+          f'(periods: {", ".join(PERIOD_DAYS)}; upstream {args.upstream_host}:{args.upstream_port})')
+    tasks = [s.serve_forever() for s in servers]
+    tasks.append(api.refresh_subscribed(args.push_interval))
+    if args.metrics_file:
+        tasks.append(write_metrics_periodically(api, args.metrics_file, args.metrics_interval))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        pool.close()
+        if args.metrics_file:
+            METRICS.write_prometheus(args.metrics_file, render_metrics(api))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the dashboard and its JSON API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--upstream-host', default='127.0.0.1')
+    parser.add_argument('--upstream-port', type=int, default=8100)
+    parser.add_argument('--pool-size', type=int, default=UPSTREAM_POOL_SIZE)
+    parser.add_argument('--stub-bank', action='store_true', help='also run the local stand-in bank API')
+    parser.add_argument('--balance-ttl', type=float, default=TTL, help='seconds a cached balance counts as fresh')
+    parser.add_argument('--balance-stale-ttl', type=float, default=STALE_TTL,
+                        help='further seconds a stale balance is still served while it refreshes')
+    parser.add_argument('--balance-cache-size', type=int, default=MAX_ENTRIES)
+    parser.add_argument('--balance-batch-window', type=float, default=BATCH_WINDOW,
+                        help='seconds refreshes for one bank are gathered into a single request')
+    parser.add_argument('--push-interval', type=float, default=PUSH_INTERVAL,
+                        help='seconds between refreshes of accounts with an open /api/stream')
+    parser.add_argument('--metrics', action='store_true', help='time request stages (see /metrics)')
+    parser.add_argument('--metrics-file', help='also write the Prometheus text to this file (implies --metrics)')
+    parser.add_argument('--metrics-interval', type=float, default=METRICS_INTERVAL)
+    parser.add_argument('--track-allocations', action='store_true', help='record bytes allocated per stage (slow)')
+    parser.add_argument('--profile-rate', type=float, default=0.0, help='share of stage calls to cProfile')
+    parser.add_argument('--profile-dir', default=None)
+    parser.add_argument('--profile-endpoint', action='store_true',
+                        help='serve /api/profile, letting clients arm cProfile for a stage (implies --metrics)')
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+    try:
+        asyncio.run(main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
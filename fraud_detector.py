@@ -0,0 +1,267 @@
+# Streaming fraud checks for the Fraud Detection Card
+# ("Positive Pay for checks & ACH, anomaly detection").
+#
+# Positive Pay: issued-check files are loaded into a dict keyed by
+# (account, check number, amount), so each presented check is decided with a
+# constant-time lookup; a second dict keyed by (account, check number)
+# tells an altered amount apart from a check that was never issued; it also
+# lets a re-issued check number replace its old amount. ACH debits are
+# matched against each account's authorized originators.
+#
+# Anomaly detection: every ACH/wire event is scored against per-account,
+# per-channel running statistics (Welford mean/variance of log amount) and a
+# sliding one-hour velocity counter, then folded into those statistics. One
+# pass, O(1) work per event, no history kept beyond the velocity window and
+# each account's MAX_COUNTERPARTIES most recent counterparties (an LRU; a
+# beneficiary that falls out of it counts as new again).
+
+import argparse
+import csv
+import math
+import random
+import time
+from collections import OrderedDict, deque
+
+# Events needed before the amount statistics are trusted
+MIN_HISTORY = 20
+AMOUNT_Z_THRESHOLD = 4.0
+VELOCITY_WINDOW = 3600
+VELOCITY_LIMIT = 20
+# Wires to a beneficiary never seen before are flagged above this amount
+NEW_BENEFICIARY_CENTS = 1_000_000
+# Counterparties remembered per account and channel for the new-beneficiary check
+MAX_COUNTERPARTIES = 256
+
+
+class PositivePayIndex:
+    """Issued checks and authorized ACH originators, decided in O(1) per item."""
+
+    def __init__(self):
+        self.issued = {}
+        self.amount_by_check = {}
+        self.paid = set()
+        self.voided = set()
+        self.ach_originators = {}
+
+    def __len__(self):
+        return len(self.issued)
+
+    def add_check(self, account, check_number, amount_cents, payee=None):
+        """
+        Issue a check, or re-issue one under the same number.
+
+        A re-issue replaces the earlier amount and payee, so only the new
+        amount is payable, and lifts a void on that number. A check that was
+        already paid stays paid; presenting it again is still a duplicate.
+        """
+        check = (account, check_number)
+        previous = self.amount_by_check.get(check)
+        if previous is not None:
+            del self.issued[(account, check_number, previous)]
+        self.issued[(account, check_number, amount_cents)] = payee
+        self.amount_by_check[check] = amount_cents
+        self.voided.discard(check)
+
+    def void_check(self, account, check_number):
+        self.voided.add((account, check_number))
+
+    def load_issued_file(self, path):
+        """Load an issued-check CSV with account, check_number, amount_cents[, payee] columns."""
+        loaded = 0
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                self.add_check(row['account'], int(row['check_number']),
+                               int(row['amount_cents']), row.get('payee'))
+                loaded += 1
+        return loaded
+
+    def authorize_originator(self, account, originator_id, max_amount_cents=None):
+        self.ach_originators.setdefault(account, {})[originator_id] = max_amount_cents
+
+    def present_check(self, account, check_number, amount_cents):
+        """Return ('pay', None) or ('exception', reason) for a presented check."""
+        check = (account, check_number)
+        if check in self.voided:
+            return 'exception', 'voided'
+        if check in self.paid:
+            return 'exception', 'duplicate_presentment'
+        if (account, check_number, amount_cents) not in self.issued:
+            if check in self.amount_by_check:
+                return 'exception', 'amount_mismatch'
+            return 'exception', 'not_issued'
+        self.paid.add(check)
+        return 'pay', None
+
+    def present_ach_debit(self, account, originator_id, amount_cents):
+        """ACH Positive Pay: only authorized originators, within their limit."""
+        allowed = self.ach_originators.get(account)
+        if allowed is None:
+            return 'pay', None
+        if originator_id not in allowed:
+            return 'exception', 'unauthorized_originator'
+        limit = allowed[originator_id]
+        if limit is not None and amount_cents > limit:
+            return 'exception', 'over_limit'
+        return 'pay', None
+
+
+class ChannelStats:
+    """Running statistics for one account on one channel."""
+
+    __slots__ = ('count', 'mean', 'm2', 'recent', 'counterparties')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.recent = deque()
+        # Least recently seen first, at most MAX_COUNTERPARTIES
+        self.counterparties = OrderedDict()
+
+    def add(self, x):
+        # Welford's online update
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+class AnomalyDetector:
+    """Single-pass scoring of ACH/wire events against each account's own history."""
+
+    def __init__(self, z_threshold=AMOUNT_Z_THRESHOLD, velocity_window=VELOCITY_WINDOW,
+                 velocity_limit=VELOCITY_LIMIT, min_history=MIN_HISTORY):
+        self.z_threshold = z_threshold
+        self.velocity_window = velocity_window
+        self.velocity_limit = velocity_limit
+        self.min_history = min_history
+        self.stats = {}
+        self.scored = 0
+        self.flagged = 0
+
+    def score(self, account, channel, amount_cents, ts, counterparty=None):
+        """
+        Score one event, then learn from it.
+
+        Returns (score, flags) where score is the amount z-score (0 until
+        the account has MIN_HISTORY events on the channel) and flags is a
+        tuple of reasons.
+        """
+        key = (account, channel)
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = ChannelStats()
+
+        flags = []
+        x = math.log1p(abs(amount_cents))
+        z = 0.0
+        if stats.count >= self.min_history:
+            std = stats.std
+            if std > 0:
+                z = (x - stats.mean) / std
+                if z > self.z_threshold:
+                    flags.append('amount_outlier')
+
+        recent = stats.recent
+        horizon = ts - self.velocity_window
+        while recent and recent[0] <= horizon:
+            recent.popleft()
+        recent.append(ts)
+        if len(recent) > self.velocity_limit:
+            flags.append('velocity')
+
+        if counterparty is not None:
+            if channel == 'wire' and counterparty not in stats.counterparties \
+                    and stats.count and abs(amount_cents) >= NEW_BENEFICIARY_CENTS:
+                flags.append('new_beneficiary')
+            counterparties = stats.counterparties
+            if counterparty in counterparties:
+                counterparties.move_to_end(counterparty)
+            else:
+                counterparties[counterparty] = None
+                if len(counterparties) > MAX_COUNTERPARTIES:
+                    counterparties.popitem(last=False)
+
+        stats.add(x)
+        self.scored += 1
+        if flags:
+            self.flagged += 1
+        return z, tuple(flags)
+
+
+def synthetic_events(n_events, n_accounts, seed=0):
+    """ACH/wire events with occasional large outliers."""
+    rnd = random.Random(seed)
+    scales = [rnd.lognormvariate(11, 1) for _ in range(n_accounts)]
+    ts = 1_700_000_000.0
+    for _ in range(n_events):
+        ts += rnd.expovariate(5)
+        account = rnd.randrange(n_accounts)
+        channel = 'wire' if rnd.random() < 0.1 else 'ach'
+        amount = int(scales[account] * rnd.lognormvariate(0, 0.5))
+        if rnd.random() < 0.0005:
+            amount *= 50
+        yield f'PNC-{account:06d}', channel, amount, ts, f'CP-{rnd.randrange(20)}'
+
+
+def benchmark(n_events, n_accounts, n_checks):
+    events = list(synthetic_events(n_events, n_accounts))
+    detector = AnomalyDetector()
+    latencies = []
+    clock = time.perf_counter_ns
+    start = time.perf_counter()
+    for event in events:
+        t0 = clock()
+        detector.score(*event)
+        latencies.append(clock() - t0)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    index = PositivePayIndex()
+    rnd = random.Random(1)
+    checks = [(f'PNC-{rnd.randrange(n_accounts):06d}', n, rnd.randrange(100, 10_000_000))
+              for n in range(n_checks)]
+    start = time.perf_counter()
+    for check in checks:
+        index.add_check(*check)
+    load_seconds = time.perf_counter() - start
+
+    presented = [(a, n, amt if rnd.random() > 0.01 else amt + 1) for a, n, amt in checks]
+    start = time.perf_counter()
+    exceptions = sum(index.present_check(*check)[0] == 'exception' for check in presented)
+    present_seconds = time.perf_counter() - start
+
+    return {
+        'events': n_events,
+        'events_per_sec': n_events / elapsed,
+        'p50_us': latencies[len(latencies) // 2] / 1000,
+        'p99_us': latencies[int(len(latencies) * 0.99)] / 1000,
+        'max_us': latencies[-1] / 1000,
+        'flagged': detector.flagged,
+        'checks_loaded_per_sec': n_checks / load_seconds,
+        'checks_presented_per_sec': n_checks / present_seconds,
+        'check_exceptions': exceptions,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark per-event fraud scoring and Positive Pay matching')
+    parser.add_argument('--events', type=int, default=500_000)
+    parser.add_argument('--accounts', type=int, default=10_000)
+    parser.add_argument('--checks', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    result = benchmark(args.events, args.accounts, args.checks)
+    print('Fraud detection benchmark')
+    print('=' * 100)
+    print(f"  anomaly scoring:   {result['events_per_sec']:,.0f} events/s over {result['events']:,} events")
+    print(f"  per-event latency: p50 {result['p50_us']:.1f}us  p99 {result['p99_us']:.1f}us  "
+          f"max {result['max_us']:.1f}us")
+    print(f"  flagged events:    {result['flagged']:,}")
+    print(f"  positive pay:      {result['checks_loaded_per_sec']:,.0f} checks/s loaded, "
+          f"{result['checks_presented_per_sec']:,.0f} checks/s decided, "
+          f"{result['check_exceptions']:,} exceptions")
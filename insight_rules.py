@@ -0,0 +1,260 @@
+# Batch rules engine for the Insights Panel (Generic Insight Cards 1-3).
+#
+# A nightly run sees the whole book of business accounts as columns (one
+# NumPy array per field, one row per account). Rules are vectorized over
+# those columns and registered with @rule; derived columns they share are
+# registered with @feature and computed at most once per run, so adding a
+# card does not add another pass over the raw data. The engine remembers
+# what each rule reported last time and only formats and emits insights that
+# appeared, changed or cleared.
+#
+# Input columns (all length n_accounts, amounts in dollars):
+#   account_id, balance, savings_balance, avg_daily_balance,
+#   prev_avg_daily_balance, upcoming_count_7d, upcoming_total_7d
+# Optional: low_balance_threshold (defaults to LOW_BALANCE_THRESHOLD)
+
+import argparse
+import time
+
+import numpy as np
+
+LOW_BALANCE_THRESHOLD = 10000.0
+# Transfers are suggested in round thousands
+TRANSFER_STEP = 1000.0
+# Smallest month-over-month change in average daily balance worth a card
+ADB_CHANGE_MIN_PCT = 10
+
+# Severities that count towards the notification badge ("Red dot if alerts present")
+ALERT_SEVERITIES = ('alert', 'warning')
+
+FEATURES = {}
+RULES = {}
+
+
+def feature(name):
+    """Register a derived column computed from the book on first use."""
+    def register(func):
+        FEATURES[name] = func
+        return func
+    return register
+
+
+def rule(name, severity, card, message):
+    """
+    Register an insight rule.
+
+    The rule gets the Book and returns (fired, signature, params): a boolean
+    mask, an int64 array that changes whenever the card text would change,
+    and a dict of columns. `message` turns one account's params into the
+    card text; it only runs for insights that changed.
+    """
+    def register(func):
+        RULES[name] = {'name': name, 'severity': severity, 'card': card,
+                       'evaluate': func, 'message': message}
+        return func
+    return register
+
+
+class Book:
+    """Column view of every account with lazily computed, cached features."""
+
+    def __init__(self, columns):
+        self.columns = dict(columns)
+        lengths = {len(values) for values in self.columns.values()}
+        if len(lengths) > 1:
+            raise ValueError('all book columns must have the same length')
+        self.size = lengths.pop() if lengths else 0
+        self._features = {}
+
+    def __getitem__(self, name):
+        if name in self.columns:
+            return self.columns[name]
+        if name not in self._features:
+            if name not in FEATURES:
+                raise KeyError(name)
+            self._features[name] = FEATURES[name](self)
+        return self._features[name]
+
+
+@feature('low_balance_threshold')
+def _low_balance_threshold(book):
+    return np.full(book.size, LOW_BALANCE_THRESHOLD)
+
+
+@feature('balance_shortfall')
+def _balance_shortfall(book):
+    return np.maximum(book['low_balance_threshold'] - book['balance'], 0.0)
+
+
+@feature('suggested_transfer')
+def _suggested_transfer(book):
+    wanted = np.ceil(book['balance_shortfall'] / TRANSFER_STEP) * TRANSFER_STEP
+    available = np.floor(book['savings_balance'] / TRANSFER_STEP) * TRANSFER_STEP
+    return np.minimum(wanted, available)
+
+
+@feature('adb_change_pct')
+def _adb_change_pct(book):
+    prev = book['prev_avg_daily_balance']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = (book['avg_daily_balance'] - prev) / np.abs(prev) * 100
+    return np.where(prev > 0, np.rint(pct), 0).astype(np.int64)
+
+
+def _low_balance_message(p):
+    if p['transfer'] > 0:
+        return f"Low balance detected - Consider moving ${p['transfer'] / 1000:,.0f}K from savings"
+    return 'Low balance detected'
+
+
+def _adb_change_message(p):
+    direction = 'higher' if p['pct'] > 0 else 'lower'
+    return f"Your average daily balance is {abs(p['pct'])}% {direction} than last month"
+
+
+def _upcoming_payments_message(p):
+    plural = 's' if p['count'] != 1 else ''
+    return f"{p['count']} upcoming payment{plural} totaling ${p['total']:,.0f} in next 7 days"
+
+
+@rule('low_balance', severity='alert', card='Generic Insight Card 1', message=_low_balance_message)
+def low_balance(book):
+    fired = book['balance_shortfall'] > 0
+    transfer = book['suggested_transfer']
+    return fired, transfer.astype(np.int64), {'transfer': transfer}
+
+
+@rule('adb_change', severity='info', card='Generic Insight Card 2', message=_adb_change_message)
+def adb_change(book):
+    pct = book['adb_change_pct']
+    return np.abs(pct) >= ADB_CHANGE_MIN_PCT, pct, {'pct': pct}
+
+
+@rule('upcoming_payments', severity='warning', card='Generic Insight Card 3',
+      message=_upcoming_payments_message)
+def upcoming_payments(book):
+    count = book['upcoming_count_7d'].astype(np.int64)
+    total = book['upcoming_total_7d']
+    signature = count * 1_000_000_000_000 + np.rint(total).astype(np.int64)
+    return count > 0, signature, {'count': count, 'total': total}
+
+
+class InsightEngine:
+    """Evaluates registered rules over a Book and emits only what changed since the last run."""
+
+    def __init__(self, rules=None):
+        self.rules = [RULES[name] for name in (rules or RULES)]
+        # rule name -> (sorted account ids, fired mask, signature) from the previous run
+        self._state = {}
+
+    def run(self, columns):
+        """
+        Evaluate every rule. Returns a list of insight changes:
+        {'action': 'upsert' | 'clear', 'account_id', 'rule', 'severity', 'card', 'message'}.
+        """
+        book = columns if isinstance(columns, Book) else Book(columns)
+        ids = np.asarray(book['account_id'])
+        order = np.argsort(ids, kind='stable')
+        ids = ids[order]
+
+        changes = []
+        for spec in self.rules:
+            fired, signature, params = spec['evaluate'](book)
+            fired = fired[order]
+            signature = np.where(fired, signature[order], 0)
+
+            prev = self._state.get(spec['name'])
+            if prev is None:
+                prev_fired = np.zeros(len(ids), dtype=bool)
+                prev_signature = np.zeros(len(ids), dtype=np.int64)
+                gone = np.empty(0, dtype=ids.dtype)
+            else:
+                prev_fired, prev_signature, gone = _align(prev, ids)
+
+            upsert = fired & ((~prev_fired) | (signature != prev_signature))
+            clear = prev_fired & ~fired
+
+            for pos in np.flatnonzero(upsert):
+                row = order[pos]
+                row_params = {key: values[row].item() for key, values in params.items()}
+                changes.append(_change('upsert', ids[pos].item(), spec, spec['message'](row_params)))
+            for account_id in np.concatenate((ids[clear], gone)):
+                changes.append(_change('clear', account_id.item(), spec, None))
+
+            self._state[spec['name']] = (ids, fired, signature)
+        return changes
+
+
+def _align(prev, ids):
+    """Map the previous run's state onto this run's (sorted) account ids."""
+    prev_ids, prev_fired, prev_signature = prev
+    if len(prev_ids) == len(ids) and np.array_equal(prev_ids, ids):
+        return prev_fired, prev_signature, np.empty(0, dtype=ids.dtype)
+
+    fired = np.zeros(len(ids), dtype=bool)
+    signature = np.zeros(len(ids), dtype=np.int64)
+    still_here = np.zeros(len(prev_ids), dtype=bool)
+    if len(prev_ids):
+        pos = np.minimum(np.searchsorted(prev_ids, ids), len(prev_ids) - 1)
+        found = prev_ids[pos] == ids
+        fired[found] = prev_fired[pos[found]]
+        signature[found] = prev_signature[pos[found]]
+        still_here[pos[found]] = True
+    gone = prev_ids[prev_fired & ~still_here]
+    return fired, signature, gone
+
+
+def _change(action, account_id, spec, message):
+    return {
+        'action': action,
+        'account_id': account_id,
+        'rule': spec['name'],
+        'severity': spec['severity'],
+        'card': spec['card'],
+        'message': message,
+    }
+
+
+def synthetic_book(n_accounts, seed=0):
+    """Random book of business accounts shaped like the demo dashboard."""
+    rng = np.random.default_rng(seed)
+    balance = rng.lognormal(mean=10.5, sigma=0.8, size=n_accounts)
+    prev_adb = balance * rng.uniform(0.8, 1.2, n_accounts)
+    return {
+        'account_id': np.arange(n_accounts, dtype=np.int64),
+        'balance': balance,
+        'savings_balance': rng.lognormal(mean=10, sigma=1, size=n_accounts),
+        'avg_daily_balance': prev_adb * rng.uniform(0.8, 1.25, n_accounts),
+        'prev_avg_daily_balance': prev_adb,
+        'upcoming_count_7d': rng.poisson(1.5, n_accounts),
+        'upcoming_total_7d': rng.gamma(2.0, 3000.0, n_accounts).round(),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark a nightly insight refresh')
+    parser.add_argument('--accounts', type=int, default=1_000_000)
+    parser.add_argument('--churn', type=float, default=0.02, help='share of accounts whose balance moves between runs')
+    args = parser.parse_args()
+
+    book = synthetic_book(args.accounts)
+    engine = InsightEngine()
+
+    start = time.perf_counter()
+    first = engine.run(book)
+    first_seconds = time.perf_counter() - start
+
+    rng = np.random.default_rng(1)
+    moved = rng.random(args.accounts) < args.churn
+    book['balance'] = np.where(moved, book['balance'] * rng.uniform(0.5, 1.5, args.accounts), book['balance'])
+
+    start = time.perf_counter()
+    second = engine.run(book)
+    second_seconds = time.perf_counter() - start
+
+    print('Insight rules refresh')
+    print('=' * 100)
+    print(f'  accounts:        {args.accounts:,}')
+    print(f'  rules:           {", ".join(RULES)}')
+    print(f'  full run:        {first_seconds:.2f}s, {len(first):,} insights emitted')
+    print(f'  incremental run: {second_seconds:.2f}s, {len(second):,} changes emitted')
@@ -0,0 +1,88 @@
+# Load test for dashboard_server.py.
+#
+# Opens `--concurrency` keep-alive connections and has each one issue API
+# requests back to back for `--duration` seconds, drawing accounts from a
+# small hot set so identical concurrent requests exercise the coalescing
+# path. Reports requests/sec and latency percentiles per endpoint.
+#
+#   python3 dashboard_server.py --stub-bank &
+#   python3 load_test.py --concurrency 64 --duration 10
+
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+from cashflow_series import PERIOD_DAYS
+from dashboard_server import read_response
+
+ENDPOINTS = ('series', 'insights', 'balances', 'features')
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def pick_target(rnd, accounts):
+    endpoint = rnd.choices(ENDPOINTS, weights=(6, 2, 2, 1))[0]
+    account = rnd.choice(accounts)
+    if endpoint == 'series':
+        return endpoint, f'/api/series?account={account}&period={rnd.choice(list(PERIOD_DAYS))}'
+    if endpoint == 'features':
+        return endpoint, '/api/features'
+    return endpoint, f'/api/{endpoint}?account={account}'
+
+
+async def worker(host, port, deadline, accounts, seed, latencies, errors):
+    rnd = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            endpoint, target = pick_target(rnd, accounts)
+            start = time.perf_counter()
+            writer.write(f'GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode('latin-1'))
+            status, _, _ = await read_response(reader)
+            latencies[endpoint].append(time.perf_counter() - start)
+            if status != 200:
+                errors[status] += 1
+    finally:
+        writer.close()
+
+
+async def run(args):
+    accounts = [f'PNC-{i:04d}' for i in range(args.accounts)]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(worker(args.host, args.port, deadline, accounts, seed, latencies, errors)
+                           for seed in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(samples) for samples in latencies.values())
+    print('Dashboard API load test')
+    print('=' * 100)
+    print(f'  {total:,} requests in {elapsed:.1f}s over {args.concurrency} connections: '
+          f'{total / elapsed:,.0f} req/s, errors: {dict(errors) or 0}')
+    print(f"  {'endpoint':<10}{'count':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for endpoint in ENDPOINTS + ('all',):
+        if endpoint == 'all':
+            samples = sorted(s for values in latencies.values() for s in values)
+        else:
+            samples = sorted(latencies.get(endpoint, []))
+        print(f'  {endpoint:<10}{len(samples):>10,}'
+              + ''.join(f'{percentile(samples, p) * 1000:>10.1f}' for p in (50, 95, 99))
+              + f'{(samples[-1] if samples else 0) * 1000:>10.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the dashboard API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--accounts', type=int, default=50, help='size of the hot account set')
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,225 @@
+# Monthly income / expenses / cash-on-hand rollup for the Cash Flow Graph.
+#
+# Server-side replacement for generatePulseLabsData in script.js, which
+# hardcodes eleven months of {income, expenses, cash} and re-runs the
+# currentCash loop on every period change. Here the months are computed from
+# transactions for all accounts at once: one bincount over (account, month)
+# keys for income (positive amounts) and one for expenses, then a cumsum over
+# the month axis for month-end cash. All figures are int64 cents.
+#
+# Months before the open month are closed and never recomputed. add() folds
+# new transactions into the open month's per-account accumulators only; a
+# transaction dated in a closed month is booked in the open month (as an
+# adjustment is after a month-end close) and counted in late_postings. A
+# transaction dated after the open month closes months until it is open.
+# months(account) returns the [{month, income, expenses, cash}] dollar rows
+# assistant_service works with, chart(account) the generatePulseLabsData
+# fields. from_table() builds the rollup from a transaction_records table,
+# the shared in-memory form of the transactions. Labels carry no year, so both default to at most twelve trailing
+# months, where every label is unique.
+
+import argparse
+import time
+
+import numpy as np
+
+from rollup_index import month_key, to_day
+
+MONTH_LABELS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+CHART_MONTHS = 11
+ASSISTANT_MONTHS = 12
+
+
+def _sum_by(keys, values, size):
+    # Float weights are exact for totals below 2**53 cents
+    return np.rint(np.bincount(keys, weights=values, minlength=size)).astype(np.int64)
+
+
+def _split(amount_cents):
+    amount = np.asarray(amount_cents, dtype=np.int64)
+    return np.maximum(amount, 0), np.maximum(-amount, 0)
+
+
+class MonthlyRollup:
+    def __init__(self, first_month, n_accounts=0, opening_cash=None, capacity=16):
+        self.first_month = int(first_month)
+        self.open_month = self.first_month
+        self.n_closed = 0
+        # Closed months, one column each: (n_accounts, capacity) cents
+        self._income = np.zeros((n_accounts, capacity), dtype=np.int64)
+        self._expenses = np.zeros((n_accounts, capacity), dtype=np.int64)
+        self._cash = np.zeros((n_accounts, capacity), dtype=np.int64)
+        self.open_income = np.zeros(n_accounts, dtype=np.int64)
+        self.open_expenses = np.zeros(n_accounts, dtype=np.int64)
+        # Cash at the start of the open month (the last close, or the opening balance)
+        self.open_start_cash = np.zeros(n_accounts, dtype=np.int64) if opening_cash is None else \
+            np.array(opening_cash, dtype=np.int64)
+        self.late_postings = 0
+
+    @property
+    def n_accounts(self):
+        return len(self.open_income)
+
+    @classmethod
+    def from_transactions(cls, account, day, amount_cents, n_accounts=None, opening_cash=None, as_of=None):
+        """Rollup of a full history; the month of as_of (default: of the last transaction) is left open."""
+        account = np.asarray(account, dtype=np.int64)
+        month = month_key(day)
+        open_month = int(month_key(to_day(as_of))) if as_of is not None else int(month.max())
+        if len(month) and month.max() > open_month:
+            raise ValueError(f'transactions after the open month {MONTH_LABELS[open_month % 12]} '
+                             f'{1970 + open_month // 12}')
+        first_month = min(int(month.min()), open_month) if len(month) else open_month
+        n_accounts = max(n_accounts or 0, int(account.max()) + 1 if len(account) else 0)
+        n_closed = open_month - first_month
+        n_months = n_closed + 1
+
+        rollup = cls(first_month, n_accounts, opening_cash, capacity=max(n_closed, 16))
+        # One grouped reduction over all (account, month) pairs, closed and open months alike
+        flat = account * n_months + (month - first_month)
+        income, expenses = _split(amount_cents)
+        income = _sum_by(flat, income, n_accounts * n_months).reshape(n_accounts, n_months)
+        expenses = _sum_by(flat, expenses, n_accounts * n_months).reshape(n_accounts, n_months)
+        cash = rollup.open_start_cash[:, None] + np.cumsum(income - expenses, axis=1)
+
+        rollup._income[:, :n_closed] = income[:, :n_closed]
+        rollup._expenses[:, :n_closed] = expenses[:, :n_closed]
+        rollup._cash[:, :n_closed] = cash[:, :n_closed]
+        rollup.open_income = income[:, n_closed].copy()
+        rollup.open_expenses = expenses[:, n_closed].copy()
+        if n_closed:
+            rollup.open_start_cash = cash[:, n_closed - 1].copy()
+        rollup.n_closed = n_closed
+        rollup.open_month = open_month
+        return rollup
+
+    @classmethod
+    def from_table(cls, table, opening_cash=None, as_of=None):
+        """Rollup of a transaction_records.TransactionTable, one row per account id of its interner."""
+        data = table.data
+        return cls.from_transactions(data['account'], data['day'], data['cents'], len(table.accounts),
+                                     opening_cash, as_of)
+
+    def ensure_accounts(self, n_accounts):
+        """Grow to n_accounts rows; new accounts start with no history and zero cash."""
+        extra = n_accounts - self.n_accounts
+        if extra <= 0:
+            return
+        self._income, self._expenses, self._cash = (np.vstack([a, np.zeros((extra, a.shape[1]), dtype=np.int64)])
+                                                    for a in (self._income, self._expenses, self._cash))
+        self.open_income, self.open_expenses, self.open_start_cash = (
+            np.concatenate([a, np.zeros(extra, dtype=np.int64)])
+            for a in (self.open_income, self.open_expenses, self.open_start_cash))
+
+    def close_month(self):
+        """Freeze the open month and open the next one."""
+        if self.n_closed == self._income.shape[1]:
+            self._income, self._expenses, self._cash = (np.hstack([a, np.zeros_like(a)])
+                                                        for a in (self._income, self._expenses, self._cash))
+        col = self.n_closed
+        closing_cash = self.open_start_cash + self.open_income - self.open_expenses
+        self._income[:, col] = self.open_income
+        self._expenses[:, col] = self.open_expenses
+        self._cash[:, col] = closing_cash
+        self.open_start_cash = closing_cash
+        self.open_income = np.zeros_like(self.open_income)
+        self.open_expenses = np.zeros_like(self.open_expenses)
+        self.n_closed += 1
+        self.open_month += 1
+
+    def add(self, account, day, amount_cents):
+        """Fold new transactions into the open month (closing months first if they run past it)."""
+        account = np.asarray(account, dtype=np.int64)
+        if not len(account):
+            return
+        month = month_key(day)
+        late = month < self.open_month
+        if late.any():
+            self.late_postings += int(late.sum())
+            month = np.maximum(month, self.open_month)
+        self.ensure_accounts(int(account.max()) + 1)
+        income, expenses = _split(amount_cents)
+        distinct = np.unique(month)
+        for m in distinct:
+            while self.open_month < m:
+                self.close_month()
+            sel = month == m if len(distinct) > 1 else slice(None)
+            np.add.at(self.open_income, account[sel], income[sel])
+            np.add.at(self.open_expenses, account[sel], expenses[sel])
+
+    def matrix(self):
+        """(month keys, income, expenses, cash) for every account, closed months then the open one."""
+        n = self.n_closed
+        income = np.hstack([self._income[:, :n], self.open_income[:, None]])
+        expenses = np.hstack([self._expenses[:, :n], self.open_expenses[:, None]])
+        cash = np.hstack([self._cash[:, :n], (self.open_start_cash + self.open_income - self.open_expenses)[:, None]])
+        return np.arange(self.first_month, self.open_month + 1), income, expenses, cash
+
+    def _account_columns(self, account, count):
+        n = self.n_closed
+        lo = max(n + 1 - count, 0) if count else 0
+        income = np.append(self._income[account, lo:n], self.open_income[account])
+        expenses = np.append(self._expenses[account, lo:n], self.open_expenses[account])
+        cash = np.append(self._cash[account, lo:n],
+                         self.open_start_cash[account] + self.open_income[account] - self.open_expenses[account])
+        labels = [MONTH_LABELS[m % 12] for m in range(self.first_month + lo, self.open_month + 1)]
+        return labels, income / 100, expenses / 100, cash / 100
+
+    def months(self, account, count=ASSISTANT_MONTHS):
+        """[{month, income, expenses, cash}] in dollars, the open month last; count=None for the full history."""
+        labels, income, expenses, cash = self._account_columns(account, count)
+        return [{'month': label, 'income': i, 'expenses': e, 'cash': c}
+                for label, i, e, c in zip(labels, income.tolist(), expenses.tolist(), cash.tolist())]
+
+    def chart(self, account, count=CHART_MONTHS):
+        """labels/income/expenses/cashOnHand as generatePulseLabsData returns them."""
+        labels, income, expenses, cash = self._account_columns(account, count)
+        return {'labels': labels, 'income': income.tolist(), 'expenses': expenses.tolist(),
+                'cashOnHand': cash.tolist()}
+
+
+if __name__ == '__main__':
+    from synthetic_business import CATEGORIES, generate
+    from transaction_records import load_columns
+
+    parser = argparse.ArgumentParser(description='Build monthly rollups from synthetic data and time incremental adds')
+    parser.add_argument('--transactions', type=int, default=1_000_000)
+    parser.add_argument('--batch-days', type=int, default=1, help='days of new transactions per add()')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    table = load_columns(generate(args.transactions, seed=args.seed), CATEGORIES)
+    records = table.data
+    n_accounts = len(table.accounts)
+    opening = (np.random.default_rng((args.seed, 3)).lognormal(10.8, 0.5, n_accounts) * 100).astype(np.int64)
+
+    start = time.perf_counter()
+    full = MonthlyRollup.from_table(table, opening)
+    full_seconds = time.perf_counter() - start
+
+    # Hold back the last month plus a few days; build on the rest, then replay them day by day
+    split_day = int(records['day'][-1]) - 35
+    head = np.searchsorted(records['day'], split_day)
+    rollup = MonthlyRollup.from_transactions(records['account'][:head], records['day'][:head],
+                                             records['cents'][:head], n_accounts, opening)
+    open_before = rollup.open_month
+    add_seconds = []
+    for first in range(split_day, int(records['day'][-1]) + 1, args.batch_days):
+        lo, hi = np.searchsorted(records['day'], [first, first + args.batch_days])
+        batch = records[lo:hi]
+        start = time.perf_counter()
+        rollup.add(batch['account'], batch['day'], batch['cents'])
+        add_seconds.append(time.perf_counter() - start)
+    matches = all(np.array_equal(a, b) for a, b in zip(rollup.matrix(), full.matrix()))
+
+    print('Monthly rollup')
+    print('=' * 100)
+    print(f'  {args.transactions:,} transactions, {n_accounts:,} accounts, {full.n_closed + 1} months')
+    print(f'  full build          {full_seconds * 1000:10.1f}ms')
+    print(f'  incremental add     {np.median(add_seconds) * 1000:10.3f}ms median per {args.batch_days}-day batch '
+          f'({len(add_seconds)} batches, {rollup.open_month - open_before} month close)')
+    print(f"  replayed rollup {'matches' if matches else 'DIFFERS FROM'} the full build")
+    print()
+    for row in full.months(0):
+        print(f"  {row['month']}  income {row['income']:>12,.2f}  expenses {row['expenses']:>12,.2f}  "
+              f"cash {row['cash']:>12,.2f}")
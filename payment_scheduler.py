@@ -0,0 +1,320 @@
+# Upcoming payments for Generic Insight Card 3 ("3 upcoming payments
+# totaling $12,500 in next 7 days") and the Payment Processing Card
+# (recurring payments).
+#
+# Recurring rules - weekly or biweekly payroll, monthly rent, one-off invoice
+# due dates - are never expanded into all their future occurrences. Each
+# schedule is filed once, under its next due day: in a timing wheel of
+# WHEEL_DAYS one-day slots when that day is inside the wheel's horizon,
+# otherwise in a min-heap. A window query [today, today + n) reads the n
+# slots it covers: every schedule with a payment in the window has its next
+# payment there, and any later payments inside the window are computed from
+# the rule. Advancing the calendar empties the slots that passed, reports
+# the payments that fell due, files each schedule under its following
+# occurrence and moves heap entries that came within the horizon into the
+# wheel. Cancelled and rescheduled entries are left in place and skipped.
+
+import argparse
+import calendar
+import copy
+import datetime
+import functools
+import heapq
+import itertools
+import random
+import time
+
+import numpy as np
+
+from rollup_index import to_day
+
+EPOCH = datetime.date(1970, 1, 1)
+WHEEL_DAYS = 128
+KINDS = ('weekly', 'monthly', 'once')
+
+
+def _date(day):
+    return EPOCH + datetime.timedelta(days=day)
+
+
+@functools.lru_cache(maxsize=None)
+def _month_index(day):
+    date = _date(day)
+    return date.year * 12 + date.month - 1
+
+
+@functools.lru_cache(maxsize=None)
+def _month_day(month_index, day_of_month):
+    """Epoch day of day_of_month in a month, clamped to the month's last day (31 = month end)."""
+    year, month = divmod(month_index, 12)
+    last = calendar.monthrange(year, month + 1)[1]
+    return (datetime.date(year, month + 1, min(day_of_month, last)) - EPOCH).days
+
+
+class Schedule:
+    __slots__ = ('schedule_id', 'account', 'payee', 'amount_cents', 'kind', 'every', 'anchor_day',
+                 'day_of_month', 'until_day', 'next_day')
+
+    def __init__(self, schedule_id, account, payee, amount_cents, kind, anchor_day, every=1, until_day=None):
+        if kind not in KINDS:
+            raise ValueError(f'unknown schedule kind {kind!r}; expected one of {KINDS}')
+        self.schedule_id = schedule_id
+        self.account = account
+        self.payee = payee
+        self.amount_cents = amount_cents
+        self.kind = kind
+        self.every = every
+        self.anchor_day = anchor_day
+        self.day_of_month = _date(anchor_day).day
+        self.until_day = until_day
+        self.next_day = None
+
+    def next_on_or_after(self, day):
+        """First payment day >= day, or None once the rule has ended."""
+        if self.kind == 'once':
+            due = self.anchor_day if self.anchor_day >= day else None
+        elif self.kind == 'weekly':
+            interval = 7 * self.every
+            steps = max(0, -(-(day - self.anchor_day) // interval))
+            due = self.anchor_day + steps * interval
+        else:
+            anchor_month = _month_index(self.anchor_day)
+            steps = max(0, -(-(_month_index(day) - anchor_month) // self.every))
+            due = _month_day(anchor_month + steps * self.every, self.day_of_month)
+            if due < day:
+                due = _month_day(anchor_month + (steps + 1) * self.every, self.day_of_month)
+        if due is None or (self.until_day is not None and due > self.until_day):
+            return None
+        return due
+
+    def following(self, due):
+        """The payment day after `due`, which must itself be a payment day; None once the rule has ended."""
+        if self.kind == 'once':
+            return None
+        if self.kind == 'weekly':
+            following = due + 7 * self.every
+        else:
+            following = _month_day(_month_index(due) + self.every, self.day_of_month)
+        return following if self.until_day is None or following <= self.until_day else None
+
+    def occurrences(self, first_day, last_day, due=None):
+        """Payment days in [first_day, last_day]; pass due if the first one is already known."""
+        if due is None:
+            due = self.next_on_or_after(first_day)
+        while due is not None and due <= last_day:
+            yield due
+            due = self.following(due)
+
+
+class PaymentScheduler:
+    """Recurring and one-off payments for all accounts, filed by next due day."""
+
+    def __init__(self, today, wheel_days=WHEEL_DAYS, on_due=None):
+        self.today = to_day(today)
+        self.wheel_days = wheel_days
+        self.on_due = on_due
+        self.schedules = {}
+        self.by_account = {}
+        # slot day % wheel_days -> schedules whose next payment is that day
+        self._slots = [[] for _ in range(wheel_days)]
+        # (day, seq, schedule) beyond the wheel's horizon
+        self._overflow = []
+        self._seq = itertools.count()
+
+    def __len__(self):
+        return len(self.schedules)
+
+    def _file(self, schedule):
+        due = schedule.next_day
+        if due is None:
+            return
+        if due < self.today + self.wheel_days:
+            self._slots[due % self.wheel_days].append(schedule)
+        else:
+            heapq.heappush(self._overflow, (due, next(self._seq), schedule))
+
+    def _live(self, schedule, day):
+        """Whether a filed entry is still current (not cancelled, replaced or moved)."""
+        return schedule.next_day == day and self.schedules.get(schedule.schedule_id) is schedule
+
+    def add(self, schedule):
+        if schedule.schedule_id in self.schedules:
+            raise KeyError(f'schedule {schedule.schedule_id!r} already exists')
+        schedule.next_day = schedule.next_on_or_after(self.today)
+        self.schedules[schedule.schedule_id] = schedule
+        self.by_account.setdefault(schedule.account, set()).add(schedule.schedule_id)
+        self._file(schedule)
+        return schedule
+
+    def add_many(self, schedules):
+        """Bulk load; far-future entries are heapified once instead of pushed one by one."""
+        horizon = self.today + self.wheel_days
+        for schedule in schedules:
+            if schedule.schedule_id in self.schedules:
+                raise KeyError(f'schedule {schedule.schedule_id!r} already exists')
+            due = schedule.next_day = schedule.next_on_or_after(self.today)
+            self.schedules[schedule.schedule_id] = schedule
+            self.by_account.setdefault(schedule.account, set()).add(schedule.schedule_id)
+            if due is None:
+                continue
+            if due < horizon:
+                self._slots[due % self.wheel_days].append(schedule)
+            else:
+                self._overflow.append((due, next(self._seq), schedule))
+        heapq.heapify(self._overflow)
+
+    def cancel(self, schedule_id):
+        schedule = self.schedules.pop(schedule_id)
+        ids = self.by_account[schedule.account]
+        ids.discard(schedule_id)
+        if not ids:
+            del self.by_account[schedule.account]
+        return schedule
+
+    def reschedule(self, schedule_id, anchor_day):
+        """Move a schedule (e.g. an invoice's new due date); returns the replacement Schedule.
+
+        The replacement is a copy, so entries filed for the old one go stale
+        even if the schedule later moves back to the same day.
+        """
+        schedule = copy.copy(self.schedules[schedule_id])
+        schedule.anchor_day = to_day(anchor_day)
+        schedule.day_of_month = _date(schedule.anchor_day).day
+        schedule.next_day = schedule.next_on_or_after(self.today)
+        self.schedules[schedule_id] = schedule
+        self._file(schedule)
+        return schedule
+
+    def advance_to(self, day):
+        """Move the calendar to day; payments due on the days passed go to on_due and are returned."""
+        day = to_day(day)
+        due = []
+        while self.today < day:
+            today = self.today
+            slot = self._slots[today % self.wheel_days]
+            self._slots[today % self.wheel_days] = []
+            for schedule in slot:
+                if not self._live(schedule, today):
+                    continue
+                due.append((today, schedule))
+                if self.on_due:
+                    self.on_due(today, schedule)
+                schedule.next_day = schedule.following(today)
+                self._file(schedule)
+            self.today = today + 1
+            horizon = self.today + self.wheel_days
+            overflow = self._overflow
+            while overflow and overflow[0][0] < horizon:
+                entry_day, _, schedule = heapq.heappop(overflow)
+                if self._live(schedule, entry_day):
+                    self._slots[entry_day % self.wheel_days].append(schedule)
+        return due
+
+    def due_within(self, days):
+        """(day, schedule) for every payment in [today, today + days), in day order."""
+        last_day = self.today + days - 1
+        schedules = self.schedules
+        found = []
+        append = found.append
+
+        def collect(schedule, due):
+            # Skip stale entries, then walk the rule forward through the window
+            if schedule.next_day != due or schedules.get(schedule.schedule_id) is not schedule:
+                return
+            while due is not None and due <= last_day:
+                append((due, schedule))
+                due = schedule.following(due)
+
+        for day in range(self.today, min(last_day, self.today + self.wheel_days - 1) + 1):
+            for schedule in self._slots[day % self.wheel_days]:
+                collect(schedule, day)
+        if last_day >= self.today + self.wheel_days:
+            for entry_day, _, schedule in self._overflow:
+                if entry_day <= last_day:
+                    collect(schedule, entry_day)
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def upcoming(self, account, days=7):
+        """One account's payments in [today, today + days): [(date, payee, amount_cents)] by date."""
+        last_day = self.today + days - 1
+        payments = []
+        for schedule_id in self.by_account.get(account, ()):
+            schedule = self.schedules[schedule_id]
+            payments.extend((due, schedule.payee, schedule.amount_cents)
+                            for due in schedule.occurrences(self.today, last_day, schedule.next_day))
+        payments.sort()
+        return [(_date(due), payee, amount) for due, payee, amount in payments]
+
+    def totals_within(self, account_ids, days=7):
+        """(count, total_cents) arrays aligned with account_ids: the upcoming_*_7d insight columns."""
+        position = {account: i for i, account in enumerate(account_ids)}
+        count = np.zeros(len(account_ids), dtype=np.int64)
+        total = np.zeros(len(account_ids), dtype=np.int64)
+        for _, schedule in self.due_within(days):
+            i = position.get(schedule.account)
+            if i is not None:
+                count[i] += 1
+                total[i] += schedule.amount_cents
+        return count, total
+
+
+def synthetic_schedules(n_accounts, today, seed=0):
+    """Payroll, rent, utilities, an annual premium and a few open invoices per account."""
+    rnd = random.Random(seed)
+    today = to_day(today)
+    seq = 0
+    for a in range(n_accounts):
+        account = f'ACCT-{a:07d}'
+        rules = [
+            ('Payroll', rnd.randrange(300_000, 3_000_000), 'weekly', today - rnd.randrange(14), rnd.choice((1, 2))),
+            ('Office Rent', rnd.randrange(150_000, 1_500_000), 'monthly', today - rnd.randrange(28), 1),
+            ('Utilities', rnd.randrange(10_000, 80_000), 'monthly', today - rnd.randrange(28), 1),
+            ('Insurance', rnd.randrange(100_000, 900_000), 'monthly', today - rnd.randrange(365), 12),
+        ]
+        rules += [(f'Vendor {rnd.randrange(10_000)}', rnd.randrange(20_000, 2_000_000), 'once',
+                   today + rnd.randrange(180), 1) for _ in range(rnd.randrange(4))]
+        for payee, amount, kind, anchor, every in rules:
+            seq += 1
+            yield Schedule(seq, account, payee, amount, kind, anchor, every)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark upcoming-payment window queries')
+    parser.add_argument('--accounts', type=int, default=200_000)
+    parser.add_argument('--today', default='2025-11-08')
+    args = parser.parse_args()
+
+    scheduler = PaymentScheduler(args.today)
+    start = time.perf_counter()
+    scheduler.add_many(synthetic_schedules(args.accounts, args.today))
+    load_seconds = time.perf_counter() - start
+
+    timings = {}
+    for days in (7, 30, 90):
+        start = time.perf_counter()
+        payments = scheduler.due_within(days)
+        timings[days] = (time.perf_counter() - start, len(payments), sum(s.amount_cents for _, s in payments))
+
+    sample = [f'ACCT-{a:07d}' for a in range(0, args.accounts, max(1, args.accounts // 10_000))]
+    start = time.perf_counter()
+    for account in sample:
+        scheduler.upcoming(account, 7)
+    account_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+    sample_upcoming = scheduler.upcoming(sample[0], 7)
+    start = time.perf_counter()
+    fell_due = scheduler.advance_to(scheduler.today + 30)
+    advance_seconds = time.perf_counter() - start
+
+    print('Upcoming payments scheduler')
+    print('=' * 100)
+    print(f'  {len(scheduler):,} schedules for {args.accounts:,} accounts loaded in {load_seconds:.2f}s '
+          f'({len(scheduler._overflow):,} beyond the {WHEEL_DAYS}-day wheel)')
+    for days, (seconds, n, cents) in timings.items():
+        print(f'  next {days:>2} days: {n:>10,} payments  ${cents / 100:>18,.0f}  in {seconds * 1000:8.1f}ms')
+    print(f'  per-account 7 day query: {account_us:.1f}us')
+    print(f'  advance 30 days: {len(fell_due):,} payments fell due in {advance_seconds:.2f}s')
+    print(f'  {sample[0]} next 7 days:')
+    for date, payee, cents in sample_upcoming:
+        print(f'    {date:%b %d}  {payee:<14} ${cents / 100:>12,.2f}')
@@ -0,0 +1,276 @@
+# Delta-only push channel for insight cards, balances and the notification
+# badge (top bar "Red dot if alerts present").
+#
+# PushBus keeps the last state published per (account, kind, key). A producer
+# hands it a full snapshot - all insight cards of an account, its balances -
+# and only the entries that changed or disappeared are sent on, as 'upsert'
+# and 'remove' events; the badge count is derived from the insight
+# severities and sent only when it changes.
+#
+# Each subscriber (one open /api/stream connection) has a bounded pending map
+# keyed by (kind, key): a newer update for an entry that has not been sent
+# yet replaces the older one instead of queueing behind it, and a subscriber
+# is flushed at most once per min_interval, so a busy account costs its
+# subscribers at most one event per entry per interval. Publishing never
+# blocks; a subscriber that falls more than max_pending entries behind
+# (a stalled connection) gets its queue dropped and a single 'resync' event
+# telling the client to refetch. Events are written as Server-Sent Events.
+#
+# The per-account state is an LRU of at most max_accounts accounts, since
+# producers publish for whatever account a request names. An evicted account
+# simply starts over: its next snapshot goes out as upserts.
+
+import argparse
+import asyncio
+import functools
+import json
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from insight_rules import ALERT_SEVERITIES, InsightEngine
+
+MAX_PENDING = 256
+MAX_ACCOUNTS = 100_000
+MIN_INTERVAL = 0.25
+HEARTBEAT = 15.0
+
+
+def sse(event):
+    """One event in text/event-stream framing."""
+    head = f"id: {event['id']}\n" if event['id'] is not None else ''
+    return f"{head}event: {event['kind']}\ndata: {json.dumps(event)}\n\n".encode('utf-8')
+
+
+class Subscriber:
+    def __init__(self, account, max_pending=MAX_PENDING, min_interval=MIN_INTERVAL):
+        self.account = account
+        self.max_pending = max_pending
+        self.min_interval = min_interval
+        self.pending = OrderedDict()
+        self.overflowed = False
+        self.ready = asyncio.Event()
+        self.last_flush = 0.0
+        self.delivered = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def offer(self, event):
+        key = (event['kind'], event['key'])
+        if key in self.pending:
+            del self.pending[key]
+            self.coalesced += 1
+        elif len(self.pending) >= self.max_pending:
+            self.dropped += len(self.pending) + 1
+            self.pending.clear()
+            self.overflowed = True
+            self.ready.set()
+            return
+        self.pending[key] = event
+        self.ready.set()
+
+    async def next_batch(self, timeout=HEARTBEAT):
+        """Events to send, oldest first; [] when nothing arrived within timeout (time for a heartbeat)."""
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        # Let rapid-fire updates collapse into the pending map until the interval is up
+        wait = self.last_flush + self.min_interval - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self.ready.clear()
+        self.last_flush = time.monotonic()
+        if self.overflowed:
+            self.overflowed = False
+            self.pending.clear()
+            self.delivered += 1
+            return [{'id': None, 'kind': 'resync', 'key': None, 'op': 'resync', 'data': None}]
+        batch = list(self.pending.values())
+        self.pending.clear()
+        self.delivered += len(batch)
+        return batch
+
+
+class PushBus:
+    """In-process pub/sub of per-account state deltas."""
+
+    def __init__(self, max_pending=MAX_PENDING, min_interval=MIN_INTERVAL, max_accounts=MAX_ACCOUNTS):
+        self.max_pending = max_pending
+        self.min_interval = min_interval
+        self.max_accounts = max_accounts
+        # account -> kind -> key -> last published payload, least recently published first
+        self.state = OrderedDict()
+        self.subscribers = {}
+        self.seq = 0
+        self.published = 0
+        self.suppressed = 0
+        self.evicted = 0
+
+    def subscribe(self, account, max_pending=None):
+        subscriber = Subscriber(account, max_pending or self.max_pending, self.min_interval)
+        self.subscribers.setdefault(account, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscribers = self.subscribers.get(subscriber.account)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscribers[subscriber.account]
+
+    def subscribed_accounts(self):
+        return list(self.subscribers)
+
+    def _event(self, account, kind, key, op, data):
+        self.seq += 1
+        event = {'id': self.seq, 'kind': kind, 'key': key, 'op': op, 'data': data}
+        self.published += 1
+        for subscriber in self.subscribers.get(account, ()):
+            subscriber.offer(event)
+        return event
+
+    def publish_snapshot(self, account, kind, entries):
+        """Diff a full {key: payload} snapshot against the last one; returns the delta events sent."""
+        state = self.state.get(account)
+        if state is None:
+            state = self.state[account] = {}
+            while len(self.state) > self.max_accounts:
+                self.state.popitem(last=False)
+                self.evicted += 1
+        else:
+            self.state.move_to_end(account)
+        previous = state.get(kind, {})
+        events = []
+        for key, payload in entries.items():
+            if previous.get(key) == payload:
+                self.suppressed += 1
+                continue
+            events.append(self._event(account, kind, key, 'upsert', payload))
+        for key in previous.keys() - entries.keys():
+            events.append(self._event(account, kind, key, 'remove', None))
+        state[kind] = dict(entries)
+        if kind == 'insights' and events:
+            alerts = sum(1 for card in entries.values() if card.get('severity') in ALERT_SEVERITIES)
+            events += self.publish_snapshot(account, 'badge', {'alerts': {'count': alerts}})
+        return events
+
+    def snapshot_events(self, account):
+        """Current state of an account as upserts, sent first on a new connection."""
+        return [{'id': self.seq, 'kind': kind, 'key': key, 'op': 'upsert', 'data': payload}
+                for kind, entries in self.state.get(account, {}).items()
+                for key, payload in entries.items()]
+
+    def stats(self):
+        subscribers = [s for group in self.subscribers.values() for s in group]
+        return {
+            'subscribers': len(subscribers),
+            'accounts': len(self.state),
+            'evicted_accounts': self.evicted,
+            'published': self.published,
+            'suppressed_unchanged': self.suppressed,
+            'delivered': sum(s.delivered for s in subscribers),
+            'coalesced': sum(s.coalesced for s in subscribers),
+            'dropped': sum(s.dropped for s in subscribers),
+        }
+
+
+async def stream(bus, account, reader, writer, heartbeat=HEARTBEAT):
+    """Serve one SSE connection until the client goes away."""
+    writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n'
+                 b'Connection: close\r\n\r\n')
+    subscriber = bus.subscribe(account)
+    # The client sends nothing more after the request, so a completed read means it hung up
+    closed = asyncio.ensure_future(reader.read())
+    try:
+        writer.write(b''.join(sse(event) for event in bus.snapshot_events(account)))
+        await writer.drain()
+        while True:
+            batch = asyncio.ensure_future(subscriber.next_batch(heartbeat))
+            await asyncio.wait((batch, closed), return_when=asyncio.FIRST_COMPLETED)
+            if closed.done():
+                batch.cancel()
+                break
+            # A slow client blocks in drain() while new updates coalesce in the pending map
+            events = batch.result()
+            writer.write(b''.join(sse(event) for event in events) if events else b': keep-alive\n\n')
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        closed.cancel()
+        bus.unsubscribe(subscriber)
+
+
+@functools.lru_cache(maxsize=None)
+def demo_cards(balance):
+    """Insight cards the real rules produce for a demo account with this balance."""
+    changes = InsightEngine().run({
+        'account_id': np.array([1]),
+        'balance': np.array([balance]),
+        'savings_balance': np.array([20000.0]),
+        'avg_daily_balance': np.array([30000.0]),
+        'prev_avg_daily_balance': np.array([28000.0]),
+        'upcoming_count_7d': np.array([2]),
+        'upcoming_total_7d': np.array([3500.0]),
+    })
+    return {c['rule']: {'severity': c['severity'], 'card': c['card'], 'message': c['message']} for c in changes}
+
+
+async def demo(args):
+    bus = PushBus(max_pending=args.max_pending, min_interval=args.min_interval)
+    fast = bus.subscribe('PNC-0001')
+    stalled = bus.subscribe('PNC-0001', max_pending=args.churn // 2)
+    received = []
+
+    async def consume():
+        while True:
+            received.extend(await fast.next_batch(1.0))
+
+    consumer = asyncio.ensure_future(consume())
+    start = time.perf_counter()
+    for i in range(args.updates):
+        # Dips under the low-balance threshold for half of every 1000 rounds
+        balance = (8000.0 if i % 1000 < 500 else 42350.0) + (i % 500)
+        bus.publish_snapshot('PNC-0001', 'balances', {'balance': {'balance': balance}})
+        bus.publish_snapshot('PNC-0001', 'insights', dict(demo_cards(balance)))
+        # Rotating entries: more than the stalled subscriber's queue holds
+        bus.publish_snapshot('PNC-0001', 'payments', {f'p{i % args.churn}': i})
+        if i % 100 == 0:
+            await asyncio.sleep(0)
+    publish_seconds = time.perf_counter() - start
+    await asyncio.sleep(args.min_interval * 2)
+    consumer.cancel()
+    stalled_batch = await stalled.next_batch(0.1)
+
+    # Replaying what the fast subscriber got must land on the final state
+    view = {}
+    for event in received:
+        entries = view.setdefault(event['kind'], {})
+        if event['op'] == 'upsert':
+            entries[event['key']] = event['data']
+        else:
+            entries.pop(event['key'], None)
+    view = {kind: entries for kind, entries in view.items() if entries}
+    expected = {kind: entries for kind, entries in bus.state['PNC-0001'].items() if entries}
+
+    stats = bus.stats()
+    print('Push channel')
+    print('=' * 100)
+    print(f'  {args.updates:,} snapshot rounds published in {publish_seconds * 1000:.0f}ms')
+    print(f"  delta events: {stats['published']:,}  unchanged entries suppressed: {stats['suppressed_unchanged']:,}")
+    print(f"  fast subscriber received {len(received):,} events ({fast.coalesced:,} coalesced away), "
+          f"final view {'matches' if view == expected else 'DIFFERS FROM'} the published state")
+    badge = sorted({e['data']['count'] for e in received if e['kind'] == 'badge'})
+    print(f"  badge counts received: {badge} (alert severities: {', '.join(ALERT_SEVERITIES)})")
+    print(f"  stalled subscriber: {stalled.dropped:,} dropped, next delivery: {[e['op'] for e in stalled_batch]}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Publish a burst of updates and show coalescing')
+    parser.add_argument('--updates', type=int, default=100_000)
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING)
+    parser.add_argument('--min-interval', type=float, default=MIN_INTERVAL)
+    parser.add_argument('--churn', type=int, default=64, help='distinct rotating entries per round')
+    asyncio.run(demo(parser.parse_args()))
@@ -0,0 +1,243 @@
+# Receivables aging for the Receivables Management Card
+# ("Automated invoicing, payment links, reminders", swipe to see aging).
+#
+# Open invoices are kept in a list sorted by due date. Aging buckets are
+# defined by days past due, so when the calendar moves forward the only
+# invoices that change bucket are the ones whose due date sits exactly on a
+# bucket edge; those are found by binary search and moved, and bucket totals
+# are adjusted in place instead of rescanning every open invoice. The same
+# edges produce reminder candidates (coming due, due today, escalations).
+# Payments look the invoice up by id and adjust one bucket; fully paid
+# invoices are tombstoned and swept out of the sorted list in bulk; an id
+# that is added again before the sweep has its old key removed first.
+
+import argparse
+import bisect
+import datetime
+import random
+import time
+
+from rollup_index import to_day
+
+EPOCH = datetime.date(1970, 1, 1)
+
+# (label, first day past due); 'current' covers invoices not yet due
+BUCKETS = (
+    ('current', None),
+    ('0-30', 0),
+    ('31-60', 31),
+    ('61-90', 61),
+    ('90+', 91),
+)
+# Days before the due date when a "coming due" reminder goes out
+REMINDER_LEAD_DAYS = 3
+# (days past due, reminder kind) raised when an invoice reaches that age
+REMINDER_EDGES = (
+    (-REMINDER_LEAD_DAYS, 'coming_due'),
+    (0, 'due_today'),
+    (31, 'overdue_30'),
+    (61, 'overdue_60'),
+    (91, 'overdue_90'),
+)
+
+
+def bucket_for(days_past_due):
+    """Index into BUCKETS for a number of days past due."""
+    index = 0
+    for i, (_, start) in enumerate(BUCKETS):
+        if start is not None and days_past_due >= start:
+            index = i
+    return index
+
+
+class Invoice:
+    __slots__ = ('invoice_id', 'customer', 'amount_cents', 'outstanding_cents', 'due_day', 'bucket')
+
+    def __init__(self, invoice_id, customer, amount_cents, due_day):
+        self.invoice_id = invoice_id
+        self.customer = customer
+        self.amount_cents = amount_cents
+        self.outstanding_cents = amount_cents
+        self.due_day = due_day
+        self.bucket = None
+
+    @property
+    def due_date(self):
+        return EPOCH + datetime.timedelta(days=self.due_day)
+
+
+class AgingBook:
+    """Open invoices for one business client, aged incrementally."""
+
+    def __init__(self, today):
+        self.today = to_day(today)
+        self.invoices = {}
+        # Sorted (due_day, invoice_id); paid invoices stay until the next sweep
+        self._by_due = []
+        # invoice_id -> due_day of paid invoices whose key is still in _by_due
+        self._tombstones = {}
+        self.totals = [0] * len(BUCKETS)
+        self.counts = [0] * len(BUCKETS)
+
+    def __len__(self):
+        return len(self.invoices)
+
+    def _place(self, invoice, bucket):
+        if invoice.bucket is not None:
+            self.totals[invoice.bucket] -= invoice.outstanding_cents
+            self.counts[invoice.bucket] -= 1
+        invoice.bucket = bucket
+        self.totals[bucket] += invoice.outstanding_cents
+        self.counts[bucket] += 1
+
+    def _register(self, invoice_id, customer, amount_cents, due):
+        if invoice_id in self.invoices:
+            raise ValueError(f'invoice {invoice_id!r} already exists')
+        stale_due = self._tombstones.pop(invoice_id, None)
+        if stale_due is not None:
+            del self._by_due[bisect.bisect_left(self._by_due, (stale_due, invoice_id))]
+        invoice = Invoice(invoice_id, customer, amount_cents, to_day(due))
+        self.invoices[invoice_id] = invoice
+        self._place(invoice, bucket_for(self.today - invoice.due_day))
+        return invoice
+
+    def add_invoice(self, invoice_id, customer, amount_cents, due):
+        invoice = self._register(invoice_id, customer, amount_cents, due)
+        bisect.insort(self._by_due, (invoice.due_day, invoice_id))
+        return invoice
+
+    def add_invoices(self, rows):
+        """Bulk load (invoice_id, customer, amount_cents, due) rows with a single sort."""
+        for row in rows:
+            invoice = self._register(*row)
+            self._by_due.append((invoice.due_day, invoice.invoice_id))
+        self._by_due.sort()
+
+    def apply_payment(self, invoice_id, amount_cents):
+        """Apply a payment; returns the amount still outstanding."""
+        if amount_cents <= 0:
+            raise ValueError(f'payment must be positive, got {amount_cents}')
+        invoice = self.invoices[invoice_id]
+        applied = min(amount_cents, invoice.outstanding_cents)
+        invoice.outstanding_cents -= applied
+        self.totals[invoice.bucket] -= applied
+        if invoice.outstanding_cents == 0:
+            self.counts[invoice.bucket] -= 1
+            del self.invoices[invoice_id]
+            self._tombstones[invoice_id] = invoice.due_day
+            if len(self._tombstones) > len(self._by_due) // 2:
+                self._sweep()
+        return invoice.outstanding_cents
+
+    def _sweep(self):
+        self._by_due = [key for key in self._by_due if key[1] in self.invoices]
+        self._tombstones = {}
+
+    def _due_between(self, first_due, last_due):
+        """Open invoices with first_due <= due_day <= last_due."""
+        lo = bisect.bisect_left(self._by_due, (first_due,))
+        hi = bisect.bisect_left(self._by_due, (last_due + 1,))
+        for due_day, invoice_id in self._by_due[lo:hi]:
+            invoice = self.invoices.get(invoice_id)
+            if invoice is not None and invoice.due_day == due_day:
+                yield invoice
+
+    def advance_to(self, day):
+        """
+        Roll the calendar forward to `day`.
+
+        Only invoices crossing a bucket or reminder edge are visited.
+        Returns the reminders raised as (kind, invoice, day) triples, day being
+        when the invoice crossed the edge, ordered by that day; a multi-day
+        advance returns every edge crossed in (previous, day].
+        """
+        day = to_day(day)
+        if day < self.today:
+            raise ValueError('aging can only move forward')
+        previous, self.today = self.today, day
+        if day == previous:
+            return []
+
+        for _, start in BUCKETS:
+            if start is None:
+                continue
+            # Invoices that reached `start` days past due during (previous, day]
+            for invoice in self._due_between(previous - start + 1, day - start):
+                target = bucket_for(day - invoice.due_day)
+                if invoice.bucket != target:
+                    self._place(invoice, target)
+
+        reminders = []
+        for edge, kind in REMINDER_EDGES:
+            # Exactly the invoices whose age reached `edge` during (previous, day]
+            for invoice in self._due_between(previous - edge + 1, day - edge):
+                reminders.append((kind, invoice, invoice.due_day + edge))
+        reminders.sort(key=lambda reminder: reminder[2])
+        return reminders
+
+    def reminder_candidates(self, lead_days=REMINDER_LEAD_DAYS):
+        """Open invoices due within the next lead_days days, soonest first."""
+        return list(self._due_between(self.today, self.today + lead_days))
+
+    def summary(self):
+        """Bucket totals for the aging swipe view."""
+        return [
+            {'bucket': label, 'count': self.counts[i], 'outstanding_cents': self.totals[i]}
+            for i, (label, _) in enumerate(BUCKETS)
+        ]
+
+    def rescan(self):
+        """Full recomputation of the buckets (used to check the incremental path)."""
+        totals = [0] * len(BUCKETS)
+        counts = [0] * len(BUCKETS)
+        for invoice in self.invoices.values():
+            b = bucket_for(self.today - invoice.due_day)
+            totals[b] += invoice.outstanding_cents
+            counts[b] += 1
+        return totals, counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark incremental receivables aging')
+    parser.add_argument('--invoices', type=int, default=500_000)
+    parser.add_argument('--days', type=int, default=90)
+    args = parser.parse_args()
+
+    rnd = random.Random(0)
+    today = to_day('2025-11-01')
+    book = AgingBook(today)
+    start = time.perf_counter()
+    book.add_invoices((f'INV-{i:07d}', f'CUST-{rnd.randrange(5000):04d}',
+                       rnd.randrange(10_000, 5_000_000), today + rnd.randrange(-120, 60))
+                      for i in range(args.invoices))
+    load_seconds = time.perf_counter() - start
+
+    ids = list(book.invoices)
+    rollover_seconds = payment_seconds = 0.0
+    reminders = payments = 0
+    for d in range(1, args.days + 1):
+        start = time.perf_counter()
+        reminders += len(book.advance_to(today + d))
+        rollover_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for invoice_id in rnd.sample(ids, 500):
+            if invoice_id in book.invoices:
+                book.apply_payment(invoice_id, rnd.randrange(10_000, 2_000_000))
+                payments += 1
+        payment_seconds += time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = book.rescan()
+    rescan_seconds = time.perf_counter() - start
+    assert expected == (book.totals, book.counts)
+
+    print('Receivables aging benchmark')
+    print('=' * 100)
+    print(f'  load {args.invoices:,} invoices:  {load_seconds:.2f}s')
+    print(f'  day rollover (avg):     {rollover_seconds / args.days * 1000:.2f}ms '
+          f'vs full rescan {rescan_seconds * 1000:.1f}ms')
+    print(f'  payment (avg):          {payment_seconds / max(payments, 1) * 1e6:.1f}us over {payments:,} payments')
+    print(f'  reminders raised:       {reminders:,}')
+    for row in book.summary():
+        print(f"    {row['bucket']:<8} {row['count']:>8,}  ${row['outstanding_cents'] / 100:>16,.2f}")
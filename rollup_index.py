@@ -0,0 +1,274 @@
+# Multi-resolution balance rollups for the Time Period Selector (7D/30D/90D/1Y/All).
+#
+# The hero chart is ~280px tall on mobile, so no pill needs more than a few
+# hundred points. Each account keeps a small pyramid of daily, weekly and
+# monthly open/close/low/high balances; a pill reads the finest level that
+# fits its point budget (binary search + slice) and, when that level is still
+# a bit too dense, thins it with Largest-Triangle-Three-Buckets. Appending a
+# day only touches the last bucket of each level.
+
+import numpy as np
+
+from cashflow_series import period_days
+
+# Points the 375px-wide chart can usefully draw
+MAX_POINTS = 300
+# A level may hold up to this many times MAX_POINTS before LTTB thins it;
+# beyond that the next coarser level is read instead
+LTTB_OVERSAMPLE = 4
+
+LEVELS = ('day', 'week', 'month')
+FIELDS = ('day', 'open', 'close', 'low', 'high')
+
+
+def to_day(value):
+    """Days since 1970-01-01 for an int, datetime.date, string or datetime64."""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return int(np.datetime64(value, 'D').astype('int64'))
+
+
+def week_key(day):
+    # Monday-aligned week number (1970-01-01 was a Thursday)
+    return (day + 3) // 7
+
+
+def month_key(day):
+    return np.asarray(day, dtype='datetime64[D]').astype('datetime64[M]').astype('int64')
+
+
+BUCKET_KEYS = {
+    'day': lambda day: day,
+    'week': week_key,
+    'month': month_key,
+}
+
+
+class RollupLevel:
+    """Append-only OHLC buckets for one resolution. `day` is the last day seen in the bucket."""
+
+    def __init__(self, name, capacity=64):
+        self.name = name
+        self.size = 0
+        self.last_key = None
+        self._arrays = {
+            'day': np.empty(capacity, dtype=np.int64),
+            'open': np.empty(capacity, dtype=np.float64),
+            'close': np.empty(capacity, dtype=np.float64),
+            'low': np.empty(capacity, dtype=np.float64),
+            'high': np.empty(capacity, dtype=np.float64),
+        }
+
+    def __len__(self):
+        return self.size
+
+    def column(self, field):
+        return self._arrays[field][:self.size]
+
+    def _grow(self, needed):
+        capacity = len(self._arrays['day'])
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for field, array in self._arrays.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self.size] = array[:self.size]
+            self._arrays[field] = grown
+
+    def extend(self, keys, day, open_, close, low, high):
+        """Bulk load whole buckets (used when building from history)."""
+        n = len(keys)
+        if not n:
+            return
+        self._grow(self.size + n)
+        sl = slice(self.size, self.size + n)
+        self._arrays['day'][sl] = day
+        self._arrays['open'][sl] = open_
+        self._arrays['close'][sl] = close
+        self._arrays['low'][sl] = low
+        self._arrays['high'][sl] = high
+        self.size += n
+        self.last_key = int(keys[-1])
+
+    def update(self, key, day, open_, close, low, high):
+        """Fold one day into the last bucket, or start a new bucket."""
+        a = self._arrays
+        if self.size and key == self.last_key:
+            i = self.size - 1
+            a['day'][i] = day
+            a['close'][i] = close
+            a['low'][i] = min(a['low'][i], low)
+            a['high'][i] = max(a['high'][i], high)
+            return
+        self._grow(self.size + 1)
+        i = self.size
+        a['day'][i] = day
+        a['open'][i] = open_
+        a['close'][i] = close
+        a['low'][i] = low
+        a['high'][i] = high
+        self.size += 1
+        self.last_key = key
+
+    def span(self, first_day, last_day):
+        """Index range of buckets whose last day falls in [first_day, last_day]."""
+        days = self.column('day')
+        return (int(np.searchsorted(days, first_day, side='left')),
+                int(np.searchsorted(days, last_day, side='right')))
+
+    def window(self, lo, hi):
+        return {field: self._arrays[field][lo:hi] for field in FIELDS}
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Returns the indices of the points to keep; first and last points are
+    always kept. The triangle areas are computed for every bucket against
+    every candidate of the bucket before it in one array operation (about
+    n * bucket width floats, small for the oversampled windows query()
+    passes in); only the chain of picks is walked in Python.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+
+    # Bucket edges over the interior points; the last bucket runs to the final point
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    sizes = np.diff(np.append(edges, n))
+    avg_x = np.add.reduceat(x, edges) / sizes
+    avg_y = np.add.reduceat(y, edges) / sizes
+
+    # (bucket, slot) point indices, -1 past the end of a shorter bucket
+    starts = edges[:-1]
+    width = int((edges[1:] - starts).max())
+    cand = starts[:, None] + np.arange(width)
+    cand[cand >= edges[1:, None]] = -1
+    # The point picked in bucket i is one of bucket i - 1's candidates (the first point for bucket 0)
+    anchor = np.vstack([np.full((1, width), -1), cand[:-1]])
+    anchor[0, 0] = 0
+
+    # area[i, a, j]: triangle of anchor a, candidate j and the next bucket's average
+    ax, ay = x[anchor][:, :, None], y[anchor][:, :, None]
+    cx, cy = x[cand][:, None, :], y[cand][:, None, :]
+    nx, ny = avg_x[1:, None, None], avg_y[1:, None, None]
+    area = np.abs((ax - nx) * (cy - ay) - (ax - cx) * (ny - ay))
+    area[np.broadcast_to((cand < 0)[:, None, :], area.shape)] = -1
+    best = area.argmax(axis=2).tolist()
+
+    picks = []
+    slot = 0
+    for row in best:
+        slot = row[slot]
+        picks.append(slot)
+    keep[1:-1] = starts + picks
+    return keep
+
+
+class RollupIndex:
+    """Daily/weekly/monthly balance pyramid for one account."""
+
+    def __init__(self, opening_balance=0.0):
+        self.opening_balance = float(opening_balance)
+        self.balance = float(opening_balance)
+        self.last_day = None
+        self.levels = {name: RollupLevel(name) for name in LEVELS}
+
+    @classmethod
+    def from_daily_net(cls, first_day, daily_net, opening_balance=0.0):
+        """Build the whole pyramid from a contiguous daily net-flow history in one pass."""
+        index = cls(opening_balance)
+        daily_net = np.asarray(daily_net, dtype=np.float64)
+        if not len(daily_net):
+            return index
+
+        first_day = to_day(first_day)
+        days = first_day + np.arange(len(daily_net), dtype=np.int64)
+        close = opening_balance + np.cumsum(daily_net)
+        open_ = np.concatenate(([opening_balance], close[:-1]))
+        low = np.minimum(open_, close)
+        high = np.maximum(open_, close)
+
+        for name in LEVELS:
+            keys = BUCKET_KEYS[name](days)
+            starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+            ends = np.concatenate((starts[1:], [len(days)])) - 1
+            index.levels[name].extend(
+                keys[starts],
+                days[ends],
+                open_[starts],
+                close[ends],
+                np.minimum.reduceat(low, starts),
+                np.maximum.reduceat(high, starts),
+            )
+
+        index.balance = float(close[-1])
+        index.last_day = int(days[-1])
+        return index
+
+    def append_day(self, day, amounts=()):
+        """
+        Apply one day's transactions (signed amounts, in posting order).
+
+        Days must arrive in order; repeating the last day adds more
+        transactions to it. Skipped days are carried forward flat.
+        """
+        day = to_day(day)
+        if self.last_day is not None:
+            if day < self.last_day:
+                raise ValueError(f'day {day} is before the last rolled-up day {self.last_day}')
+            for gap_day in range(self.last_day + 1, day):
+                self._fold(gap_day, self.balance, self.balance, self.balance, self.balance)
+
+        amounts = np.asarray(amounts, dtype=np.float64)
+        open_ = self.balance
+        if len(amounts):
+            running = open_ + np.cumsum(amounts)
+            close = float(running[-1])
+            low = min(open_, float(running.min()))
+            high = max(open_, float(running.max()))
+        else:
+            close = low = high = open_
+        self._fold(day, open_, close, low, high)
+
+    def _fold(self, day, open_, close, low, high):
+        for name, level in self.levels.items():
+            key = int(BUCKET_KEYS[name](day))
+            level.update(key, day, open_, close, low, high)
+        self.balance = close
+        self.last_day = day
+
+    def query(self, period, end_day=None, max_points=MAX_POINTS):
+        """
+        Chart points for a period pill.
+
+        Reads at most max_points * LTTB_OVERSAMPLE buckets from the finest
+        level that fits, then thins to max_points with LTTB if needed.
+        """
+        if self.last_day is None:
+            return {'resolution': 'day', **{field: np.empty(0) for field in FIELDS}}
+
+        end_day = self.last_day if end_day is None else to_day(end_day)
+        first_day = end_day - period_days(period) + 1
+
+        budget = max_points * LTTB_OVERSAMPLE
+        for name in LEVELS:
+            level = self.levels[name]
+            lo, hi = level.span(first_day, end_day)
+            if hi - lo <= budget or name == LEVELS[-1]:
+                break
+
+        points = level.window(lo, hi)
+        if hi - lo > max_points:
+            keep = lttb(points['day'], points['close'], max_points)
+            points = {field: values[keep] for field, values in points.items()}
+        points['day'] = points['day'].astype('datetime64[D]')
+        return {'resolution': name, **points}
@@ -1,5 +1,9 @@
-
-import pandas as pd
+import argparse
+import csv
+import hashlib
+import io
+import os
+import sys
 
 # Create comprehensive feature specification for Business 360 mobile-first approach
 
@@ -158,7 +162,21 @@ feature_structure = {
     ]
 }
 
-features_df = pd.DataFrame(feature_structure)
+FEATURE_CSV = 'business_360_feature_specification.csv'
+LAYOUT_TXT = 'business_360_mobile_layout_spec.txt'
+
+
+def build_feature_rows(structure):
+    # The columns are parallel lists; a missing entry would silently shift every row after it
+    lengths = {column: len(values) for column, values in structure.items()}
+    if len(set(lengths.values())) > 1:
+        detail = ', '.join(f'{column}={n}' for column, n in lengths.items())
+        raise ValueError(f'feature_structure columns have different lengths: {detail}')
+    columns = list(structure)
+    return [dict(zip(columns, values)) for values in zip(*structure.values())]
+
+
+feature_rows = build_feature_rows(feature_structure)
 
 # Create detailed screen layout specification
 screen_layout = """
@@ -546,16 +564,76 @@ Touch Targets:
   • Adequate spacing (8px minimum) between interactive elements
 """
 
-# Save detailed specification
-features_df.to_csv('business_360_feature_specification.csv', index=False)
-
-with open('business_360_mobile_layout_spec.txt', 'w', encoding='utf-8') as f:
-    f.write(screen_layout)
-
-print("Business 360 Mobile-First Specification Created")
-print("=" * 100)
-print("\nFeature Specification Table:")
-print(features_df.to_string(index=False))
-print("\n\n✓ Files created:")
-print("  - business_360_feature_specification.csv")
-print("  - business_360_mobile_layout_spec.txt")
+def feature_csv(structure):
+    # Same dialect pandas.DataFrame.to_csv(index=False) produced
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    writer.writerow(structure)
+    writer.writerows(zip(*structure.values()))
+    return out.getvalue()
+
+
+def feature_table(rows):
+    columns = list(rows[0]) if rows else []
+    widths = {c: max(len(c), *(len(row[c]) for row in rows)) for c in columns}
+    lines = [' '.join(c.rjust(widths[c]) for c in columns)]
+    lines += [' '.join(row[c].rjust(widths[c]) for c in columns) for row in rows]
+    return '\n'.join(lines)
+
+
+def write_if_changed(path, content):
+    # Skip the write when the file on disk already hashes the same
+    data = content.encode('utf-8')
+    try:
+        with open(path, 'rb') as f:
+            if hashlib.sha256(f.read()).digest() == hashlib.sha256(data).digest():
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path, 'wb') as f:
+        f.write(data)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the Business 360 specification artifacts')
+    parser.add_argument('--out-dir', default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument('--show', action='store_true', help='print the feature specification table')
+    parser.add_argument('--check', action='store_true',
+                        help='do not write; exit 1 if any artifact is out of date (CI / pre-commit)')
+    args = parser.parse_args(argv)
+
+    artifacts = {
+        FEATURE_CSV: feature_csv(feature_structure),
+        LAYOUT_TXT: screen_layout,
+    }
+
+    if args.check:
+        stale = []
+        for name, content in artifacts.items():
+            try:
+                with open(os.path.join(args.out_dir, name), encoding='utf-8', newline='') as f:
+                    if f.read() == content:
+                        continue
+            except FileNotFoundError:
+                pass
+            stale.append(name)
+        for name in stale:
+            print(f'  out of date: {name}')
+        return 1 if stale else 0
+
+    # Save detailed specification
+    print("Business 360 Mobile-First Specification")
+    print("=" * 100)
+    if args.show:
+        print("\nFeature Specification Table:")
+        print(feature_table(feature_rows))
+        print()
+    for name, content in artifacts.items():
+        written = write_if_changed(os.path.join(args.out_dir, name), content)
+        print(f"  {'✓ written  ' if written else '= unchanged'} {name}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,200 @@
+# Precomputed static snapshots of the dashboard API for static hosting.
+#
+# Instead of generating chart data in the browser on every load, the build
+# writes every /api payload for every account ahead of time:
+#
+#   <out>/<account>/series-<period>.<hash>.json   Cash Flow Graph, one per period pill
+#   <out>/<account>/insights.<hash>.json          Generic Insight Cards
+#   <out>/<account>/balances.<hash>.json          Real-Time Balance Card
+#   <out>/index.json                              account -> fingerprint + file names
+#
+# Each payload is also written pre-compressed (.gz, and .br when the brotli
+# package is installed). File names carry a hash of the content, so they can
+# be served with immutable cache headers and an unchanged payload is never
+# rewritten. Accounts are built in parallel on a process pool. An account is
+# rebuilt only when its fingerprint (build version, end date, balances)
+# differs from the one recorded in the previous index.json.
+#
+#   python3 snapshot_builder.py dist/api --accounts 1000
+#   python3 snapshot_builder.py dist/api --balances balances.json --end-date 2025-11-01
+
+import argparse
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from cashflow_series import PERIOD_DAYS
+from dashboard_server import account_series, insight_cards, stub_balances
+
+# Bump when payload shapes change so every account is rebuilt
+SNAPSHOT_VERSION = 1
+CHUNK_SIZE = 64
+HASH_CHARS = 16
+
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+def encode(payload):
+    return json.dumps(payload, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+def fingerprint(account, balances, end_date):
+    """Hash of everything an account's payloads are derived from."""
+    return hashlib.sha256(encode([SNAPSHOT_VERSION, account, str(end_date), balances])).hexdigest()
+
+
+def compressed_variants(body):
+    """(suffix, bytes) for every encoding written next to the raw JSON."""
+    variants = [('', body), ('.gz', gzip.compress(body, 9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(body, quality=11)))
+    return variants
+
+
+def _write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def write_payload(out, directory, name, payload):
+    """Write payload and its compressed copies under a content-hashed name.
+
+    Returns (relative path, {encoding: bytes written}); nothing is written if
+    the same content is already on disk.
+    """
+    body = encode(payload)
+    relative = f'{directory}/{name}.{hashlib.sha256(body).hexdigest()[:HASH_CHARS]}.json'
+    full = os.path.join(out, relative)
+    if os.path.exists(full):
+        return relative, {}
+    variants = compressed_variants(body)
+    # Raw file last: its presence means the whole set is complete
+    for suffix, data in variants[1:] + variants[:1]:
+        _write_atomic(full + suffix, data)
+    return relative, {suffix or '.json': len(data) for suffix, data in variants}
+
+
+def build_account(out, account, balances, end_date):
+    directory = _SAFE_NAME.sub('_', account)
+    os.makedirs(os.path.join(out, directory), exist_ok=True)
+    payloads = {f'series-{period}': account_series(account, period, end_date) for period in PERIOD_DAYS}
+    payloads['insights'] = insight_cards(account, balances, end_date)
+    payloads['balances'] = balances
+    files = {}
+    written = {}
+    for name, payload in payloads.items():
+        files[name], sizes = write_payload(out, directory, name, payload)
+        for encoding, size in sizes.items():
+            written[encoding] = written.get(encoding, 0) + size
+    return files, written
+
+
+def build_chunk(out, jobs, end_date):
+    """Worker entry point: build a list of (account, balances, fingerprint) jobs."""
+    return [(account, digest, *build_account(out, account, balances, end_date))
+            for account, balances, digest in jobs]
+
+
+def load_index(out):
+    try:
+        with open(os.path.join(out, 'index.json')) as f:
+            return json.load(f)['accounts']
+    except FileNotFoundError:
+        return {}
+
+
+def remove_unreferenced(out, old_entries, new_entries):
+    """Delete files of the previous build that the new index no longer points to."""
+    keep = {path for entry in new_entries for path in entry['files'].values()}
+    removed = 0
+    for entry in old_entries:
+        for path in entry['files'].values():
+            if path in keep:
+                continue
+            for suffix in ('', '.gz', '.br'):
+                try:
+                    os.remove(os.path.join(out, path + suffix))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+    return removed
+
+
+def build(out, balances_by_account, end_date=None, workers=None, chunk_size=CHUNK_SIZE):
+    """Build snapshots for every account; returns a stats dict."""
+    end_date = end_date or datetime.date.today().isoformat()
+    os.makedirs(out, exist_ok=True)
+    previous = load_index(out)
+    index = {}
+    jobs = []
+    for account, balances in balances_by_account.items():
+        digest = fingerprint(account, balances, end_date)
+        entry = previous.get(account)
+        if entry is not None and entry['fingerprint'] == digest and all(
+                os.path.exists(os.path.join(out, path)) for path in entry['files'].values()):
+            index[account] = entry
+        else:
+            jobs.append((account, balances, digest))
+
+    written = {}
+    chunks = [jobs[i:i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(build_chunk, out, chunk, end_date) for chunk in chunks]
+        for future in futures:
+            for account, digest, files, sizes in future.result():
+                index[account] = {'fingerprint': digest, 'files': files}
+                for encoding, size in sizes.items():
+                    written[encoding] = written.get(encoding, 0) + size
+
+    _write_atomic(os.path.join(out, 'index.json'),
+                  encode({'version': SNAPSHOT_VERSION, 'end_date': end_date,
+                          'periods': list(PERIOD_DAYS), 'accounts': index}))
+
+    changed = [previous[account] for account, *_ in jobs if account in previous]
+    dropped = [entry for account, entry in previous.items() if account not in balances_by_account]
+    removed = remove_unreferenced(out, changed + dropped, [index[account] for account, *_ in jobs])
+    return {'accounts': len(index), 'rebuilt': len(jobs), 'unchanged': len(index) - len(jobs),
+            'removed_files': removed, 'bytes_written': written}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Precompute static dashboard API snapshots')
+    parser.add_argument('out', help='output directory (e.g. dist/api)')
+    parser.add_argument('--accounts', type=int, default=1000, help='PNC-#### accounts with stub balances')
+    parser.add_argument('--balances', help='JSON file {account: balances payload} instead of stub balances')
+    parser.add_argument('--end-date', help='last day on the charts (default: today)')
+    parser.add_argument('--workers', type=int, default=None, help='process pool size (default: CPU count)')
+    args = parser.parse_args()
+
+    if args.balances:
+        with open(args.balances) as f:
+            balances_by_account = json.load(f)
+    else:
+        balances_by_account = {account: stub_balances(account)
+                               for account in (f'PNC-{i:04d}' for i in range(args.accounts))}
+
+    start = time.perf_counter()
+    stats = build(args.out, balances_by_account, args.end_date, args.workers)
+    seconds = time.perf_counter() - start
+
+    print('Static snapshot build')
+    print('=' * 100)
+    print(f"  accounts: {stats['accounts']:,}  rebuilt: {stats['rebuilt']:,}  unchanged: {stats['unchanged']:,}  "
+          f"stale files removed: {stats['removed_files']:,}  in {seconds:.2f}s")
+    for encoding, size in sorted(stats['bytes_written'].items()):
+        print(f'  written {encoding:<6}{size / 1e6:>10.2f} MB')
+    if brotli is None:
+        print('  brotli not installed: skipped .br files (pip install brotli)')
@@ -0,0 +1,314 @@
+# Per-stage instrumentation for the dashboard data pipeline.
+#
+#   with stage('series', tenant=account) as s:
+#       payload = build()
+#       s.items = len(payload['values'])
+#
+#   @timed('features', items=len)
+#   def load_features(): ...
+#
+# Disabled (the default, unless B360_METRICS=1), stage() hands back one
+# shared no-op context manager and @timed calls straight through, so hooks
+# can stay in hot paths. Enabled, each stage records calls, errors, items and
+# a wall-time histogram, plus bytes allocated when track_allocations is on
+# (tracemalloc; expensive, meant for diagnosis). Per stage the TOP_TENANTS
+# tenants with the slowest single call are kept, so a slow tenant is visible
+# without a metric series per account.
+#
+# render_prometheus()/write_prometheus() produce the Prometheus text format
+# (write_prometheus replaces the file atomically, for the node_exporter
+# textfile collector). cProfile runs on a random profile_rate share of stage
+# calls, or on the next calls armed with request_profile(stage, tenant); each
+# profile is dumped to profile_dir as <stage>-<tenant>-<time>-<pid>.prof.
+
+import cProfile
+import functools
+import inspect
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+TOP_TENANTS = 10
+# Distinct (stage, tenant) profile requests that may be waiting at once
+MAX_ARMED = 100
+METRIC_PREFIX = 'b360_stage'
+PROFILE_DIR = os.path.join(tempfile.gettempdir(), 'b360-profiles')
+
+_SAFE_NAME = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+class StageStats:
+    __slots__ = ('calls', 'errors', 'seconds', 'items', 'alloc_bytes', 'buckets', 'worst', 'worst_floor')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.items = 0
+        self.alloc_bytes = 0
+        # Non-cumulative counts per bucket; the last slot is +Inf
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        # tenant -> slowest call, at most TOP_TENANTS entries; floor is the smallest once full
+        self.worst = {}
+        self.worst_floor = 0.0
+
+    def observe(self, seconds, items, alloc_bytes, tenant, error):
+        self.calls += 1
+        self.errors += error
+        self.seconds += seconds
+        self.items += items
+        self.alloc_bytes += alloc_bytes
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        if tenant is not None and seconds > self.worst_floor and seconds > self.worst.get(tenant, 0.0):
+            worst = self.worst
+            worst[tenant] = seconds
+            if len(worst) > TOP_TENANTS:
+                del worst[min(worst, key=worst.get)]
+            if len(worst) == TOP_TENANTS:
+                self.worst_floor = min(worst.values())
+
+
+class _NullStage:
+    """What stage() returns while disabled; attribute writes are ignored."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ('registry', 'name', 'tenant', 'items', 'start', 'alloc_start', 'profiler')
+
+    def __init__(self, registry, name, tenant, items):
+        self.registry = registry
+        self.name = name
+        self.tenant = tenant
+        self.items = items
+
+    def __enter__(self):
+        registry = self.registry
+        self.alloc_start = tracemalloc.get_traced_memory()[0] if registry.track_allocations else 0
+        self.profiler = registry._start_profile(self.name, self.tenant)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        registry = self.registry
+        if self.profiler is not None:
+            registry._finish_profile(self.profiler, self.name, self.tenant)
+        alloc = tracemalloc.get_traced_memory()[0] - self.alloc_start if registry.track_allocations else 0
+        registry._record(self.name, seconds, self.items, max(alloc, 0), self.tenant, exc_type is not None)
+        return False
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+class Registry:
+    def __init__(self):
+        self.enabled = False
+        self.track_allocations = False
+        self.profile_rate = 0.0
+        self.profile_dir = PROFILE_DIR
+        self.stats = {}
+        self.profiles_written = 0
+        self._armed = {}
+        self._profiling = False
+        self._lock = threading.Lock()
+        self._random = random.Random()
+
+    def configure(self, enabled=None, track_allocations=None, profile_rate=None, profile_dir=None):
+        if enabled is not None:
+            self.enabled = enabled
+        if track_allocations is not None:
+            if track_allocations and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            self.track_allocations = track_allocations
+        if profile_rate is not None:
+            self.profile_rate = profile_rate
+        if profile_dir is not None:
+            self.profile_dir = profile_dir
+
+    def reset(self):
+        with self._lock:
+            self.stats = {}
+            self._armed = {}
+
+    def stage(self, name, tenant=None, items=0):
+        """Context manager timing one run of a stage; set .items on it to count work done."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, tenant, items)
+
+    def timed(self, name, items=None):
+        """Decorator form of stage(); items(result) -> count, if given. Works on coroutine functions."""
+        def decorate(func):
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    if not self.enabled:
+                        return await func(*args, **kwargs)
+                    with self.stage(name) as s:
+                        result = await func(*args, **kwargs)
+                        if items is not None:
+                            s.items = items(result)
+                    return result
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with self.stage(name) as s:
+                    result = func(*args, **kwargs)
+                    if items is not None:
+                        s.items = items(result)
+                return result
+            return wrapper
+        return decorate
+
+    def request_profile(self, name, tenant=None, count=1):
+        """Profile the next `count` calls of a stage (for one tenant, or any tenant if None)."""
+        with self._lock:
+            if (name, tenant) not in self._armed and len(self._armed) >= MAX_ARMED:
+                raise ValueError(f'{MAX_ARMED} profile requests already pending')
+            self._armed[(name, tenant)] = self._armed.get((name, tenant), 0) + count
+
+    def _record(self, name, seconds, items, alloc_bytes, tenant, error):
+        with self._lock:
+            stats = self.stats.get(name)
+            if stats is None:
+                stats = self.stats[name] = StageStats()
+            stats.observe(seconds, items, alloc_bytes, tenant, error)
+
+    def _start_profile(self, name, tenant):
+        if not self._armed and not self.profile_rate:
+            return None
+        with self._lock:
+            # One profiler at a time: cProfile cannot nest
+            if self._profiling:
+                return None
+            for key in ((name, tenant), (name, None)):
+                if self._armed.get(key):
+                    self._armed[key] -= 1
+                    if not self._armed[key]:
+                        del self._armed[key]
+                    break
+            else:
+                if not self.profile_rate or self._random.random() >= self.profile_rate:
+                    return None
+            self._profiling = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _finish_profile(self, profiler, name, tenant):
+        profiler.disable()
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            filename = '-'.join((_SAFE_NAME.sub('_', name), _SAFE_NAME.sub('_', str(tenant or 'all')),
+                                 time.strftime('%Y%m%dT%H%M%S'), str(os.getpid())))
+            profiler.dump_stats(os.path.join(self.profile_dir, filename + '.prof'))
+            self.profiles_written += 1
+        finally:
+            with self._lock:
+                self._profiling = False
+
+    def render_prometheus(self):
+        with self._lock:
+            snapshot = {name: (stats.calls, stats.errors, stats.seconds, stats.items, stats.alloc_bytes,
+                               list(stats.buckets), dict(stats.worst))
+                        for name, stats in sorted(self.stats.items())}
+        p = METRIC_PREFIX
+        lines = [f'# HELP {p}_seconds Wall time per pipeline stage call.', f'# TYPE {p}_seconds histogram']
+        for name, (calls, _, seconds, _, _, buckets, _) in snapshot.items():
+            label = f'stage="{_escape(name)}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), buckets):
+                cumulative += count
+                lines.append(f'{p}_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_seconds_sum{{{label}}} {seconds:.6f}')
+            lines.append(f'{p}_seconds_count{{{label}}} {calls}')
+
+        counters = [('errors_total', 'Stage calls that raised.', 1),
+                    ('items_total', 'Items processed per stage.', 3)]
+        if self.track_allocations:
+            counters.append(('alloc_bytes_total', 'Bytes allocated and still held at stage exit.', 4))
+        for metric, help_text, field in counters:
+            lines += [f'# HELP {p}_{metric} {help_text}', f'# TYPE {p}_{metric} counter']
+            lines += [f'{p}_{metric}{{stage="{_escape(name)}"}} {values[field]}'
+                      for name, values in snapshot.items()]
+
+        lines += [f'# HELP {p}_tenant_worst_seconds Slowest call per stage for the {TOP_TENANTS} slowest tenants.',
+                  f'# TYPE {p}_tenant_worst_seconds gauge']
+        for name, values in snapshot.items():
+            for tenant, seconds in sorted(values[6].items(), key=lambda item: -item[1]):
+                lines.append(f'{p}_tenant_worst_seconds{{stage="{_escape(name)}",tenant="{_escape(tenant)}"}} '
+                             f'{seconds:.6f}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path, text=None):
+        """Atomically replace path with render_prometheus(), or with `text` when the caller adds its own lines."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            f.write(self.render_prometheus() if text is None else text)
+        os.replace(tmp, path)
+
+
+REGISTRY = Registry()
+configure = REGISTRY.configure
+stage = REGISTRY.stage
+timed = REGISTRY.timed
+request_profile = REGISTRY.request_profile
+
+if os.environ.get('B360_METRICS') == '1':
+    REGISTRY.configure(enabled=True)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Measure stage() overhead, disabled and enabled')
+    parser.add_argument('--calls', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    def loop():
+        start = time.perf_counter()
+        for i in range(args.calls):
+            with stage('noop', tenant=i % 100):
+                pass
+        return (time.perf_counter() - start) / args.calls * 1e9
+
+    disabled = loop()
+    configure(enabled=True)
+    enabled = loop()
+    REGISTRY.reset()
+    configure(track_allocations=True)
+    tracked = loop()
+
+    print('Stage instrumentation overhead')
+    print('=' * 100)
+    print(f'  disabled              {disabled:>8.0f} ns/stage')
+    print(f'  enabled               {enabled:>8.0f} ns/stage')
+    print(f'  enabled + tracemalloc {tracked:>8.0f} ns/stage')
+    print()
+    print(REGISTRY.render_prometheus())
@@ -0,0 +1,164 @@
+# Seeded synthetic business-account transactions for benchmarks.
+#
+# Shapes follow the demo data in script.js:
+#   - weekend dips: weekend days get WEEKEND_FACTOR of weekday activity,
+#     as in generateChartData
+#   - monthly income/expense mix and volume from the monthlyData table in
+#     generatePulseLabsData (PULSE_LABS_MONTHLY) by month of year; Nov and
+#     Dec, which the demo has no data for, reuse Jan and Feb
+#   - scheduled payments: monthly rent on the 1st and biweekly payroll per
+#     account, the same schedules the Upcoming Payments insight looks at
+#
+# Everything is generated column-wise with NumPy, so 10M transactions take a
+# few seconds. Same (n, accounts, end_day, seed) -> same data.
+
+import argparse
+import time
+
+import numpy as np
+
+from assistant_service import PULSE_LABS_MONTHLY
+from cashflow_series import WEEKEND_FACTOR
+from rollup_index import month_key, to_day
+from transaction_ingest import SECONDS_PER_DAY
+
+CATEGORIES = ['Income', 'Payroll', 'Rent', 'Software', 'Marketing', 'Supplies', 'Travel',
+              'Utilities', 'Insurance', 'Taxes', 'Professional Services', 'Other']
+INCOME, PAYROLL, RENT = 0, 1, 2
+HISTORY_DAYS = 365
+PAYROLL_EVERY = 14
+TXNS_PER_ACCOUNT = 2000
+COUNTERPARTIES = 50_000
+
+# Closed demo months only; the open month has no activity yet
+_SHAPE = [m for m in PULSE_LABS_MONTHLY if m['income'] or m['expenses']]
+_SHAPE_VOLUME = np.array([m['income'] + m['expenses'] for m in _SHAPE], dtype=np.float64)
+_SHAPE_INCOME_SHARE = np.array([m['income'] for m in _SHAPE]) / _SHAPE_VOLUME
+
+
+def month_start(day):
+    return np.asarray(np.asarray(day, dtype='datetime64[D]').astype('datetime64[M]').astype('datetime64[D]'),
+                      dtype=np.int64)
+
+
+def _shape_row(days):
+    return month_key(days) % 12 % len(_SHAPE)
+
+
+def day_weights(days):
+    """Relative transaction volume per day: monthly shape x weekend dip."""
+    shape = _shape_row(days)
+    weekend = (days + 3) % 7 >= 5
+    weights = _SHAPE_VOLUME[shape] / _SHAPE_VOLUME.mean() * np.where(weekend, WEEKEND_FACTOR, 1.0)
+    return weights / weights.sum()
+
+
+def schedules(n_accounts, seed=0):
+    """Per-account recurring payments: rent (cents, on the 1st) and payroll (cents, offset, every 14 days)."""
+    rng = np.random.default_rng((seed, 1))
+    return {
+        'rent_cents': (rng.lognormal(12.2, 0.5, n_accounts) // 100 * 100).astype(np.int64),
+        'payroll_cents': (rng.lognormal(12.8, 0.6, n_accounts) // 100 * 100).astype(np.int64),
+        'payroll_offset': rng.integers(0, PAYROLL_EVERY, n_accounts),
+    }
+
+
+def scheduled_occurrences(plan, first_day, last_day):
+    """(account, day, amount_cents, category) of every rent and payroll payment in [first_day, last_day]."""
+    n_accounts = len(plan['rent_cents'])
+    rent_days = np.unique(month_start(np.arange(first_day, last_day + 1)))
+    rent_days = rent_days[rent_days >= first_day]
+
+    payroll_base = np.arange(first_day - first_day % PAYROLL_EVERY, last_day + 1, PAYROLL_EVERY)
+    payroll_days = payroll_base[None, :] + plan['payroll_offset'][:, None]
+    payroll_ok = (payroll_days >= first_day) & (payroll_days <= last_day)
+    payroll_account = np.broadcast_to(np.arange(n_accounts)[:, None], payroll_days.shape)[payroll_ok]
+
+    account = np.concatenate((np.repeat(np.arange(n_accounts), len(rent_days)), payroll_account))
+    day = np.concatenate((np.tile(rent_days, n_accounts), payroll_days[payroll_ok]))
+    amount = -np.concatenate((np.repeat(plan['rent_cents'], len(rent_days)),
+                              plan['payroll_cents'][payroll_account]))
+    category = np.concatenate((np.full(n_accounts * len(rent_days), RENT), np.full(len(payroll_account), PAYROLL)))
+    return account, day, amount, category
+
+
+def generate(n_transactions, n_accounts=None, end_day='2025-11-01', history_days=HISTORY_DAYS, seed=0):
+    """
+    Time-sorted transaction columns:
+
+        account (int32), day (int32), ts (float64 epoch seconds),
+        amount_cents (int64), category (uint16), counterparty (int32),
+        scheduled (bool)
+
+    plus 'plan' (the per-account schedules) and 'first_day'/'last_day'.
+    """
+    if n_accounts is None:
+        n_accounts = max(1, n_transactions // TXNS_PER_ACCOUNT)
+    last_day = to_day(end_day)
+    first_day = last_day - history_days + 1
+    plan = schedules(n_accounts, seed)
+    s_account, s_day, s_amount, s_category = scheduled_occurrences(plan, first_day, last_day)
+    n_random = n_transactions - len(s_account)
+    if n_random < 0:
+        raise ValueError(f'{n_transactions} transactions cannot hold the {len(s_account)} scheduled payments '
+                         f'of {n_accounts} accounts; use fewer accounts')
+
+    rng = np.random.default_rng(seed)
+    days = np.arange(first_day, last_day + 1)
+    day = rng.choice(days, n_random, p=day_weights(days))
+    income = rng.random(n_random) < _SHAPE_INCOME_SHARE[_shape_row(day)]
+    # Customer payments run larger than card spend and cover the scheduled outflows
+    magnitude = np.maximum(rng.lognormal(np.where(income, 10.95, 10.8), 1.0), 100).astype(np.int64)
+    category = np.where(income, INCOME, rng.integers(3, len(CATEGORIES), n_random))
+
+    columns = {
+        'account': np.concatenate((rng.integers(0, n_accounts, n_random), s_account)).astype(np.int32),
+        'day': np.concatenate((day, s_day)).astype(np.int32),
+        'amount_cents': np.concatenate((np.where(income, magnitude, -magnitude), s_amount)).astype(np.int64),
+        'category': np.concatenate((category, s_category)).astype(np.uint16),
+        'counterparty': np.concatenate((rng.zipf(1.3, n_random) % COUNTERPARTIES,
+                                        np.full(len(s_account), -1))).astype(np.int32),
+        'scheduled': np.concatenate((np.zeros(n_random, dtype=bool), np.ones(len(s_account), dtype=bool))),
+    }
+    # Business hours, clustered early afternoon; scheduled payments post at 06:00
+    seconds = np.concatenate((np.clip(rng.normal(13 * 3600, 3 * 3600, n_random), 0, SECONDS_PER_DAY - 1),
+                              np.full(len(s_account), 6 * 3600.0)))
+    columns['ts'] = columns['day'].astype(np.float64) * SECONDS_PER_DAY + seconds
+    order = np.argsort(columns['ts'], kind='stable')
+    columns = {name: values[order] for name, values in columns.items()}
+    columns.update(plan=plan, first_day=first_day, last_day=last_day, n_accounts=n_accounts)
+    return columns
+
+
+def iter_events(txns, limit=None):
+    """Ingest-shaped event dicts ({'id', 'account', 'ts', 'amount_cents'}) for the first `limit` rows."""
+    n = len(txns['ts']) if limit is None else min(limit, len(txns['ts']))
+    accounts = txns['account'][:n].tolist()
+    ts = txns['ts'][:n].tolist()
+    amounts = txns['amount_cents'][:n].tolist()
+    for i in range(n):
+        yield {'id': i, 'account': accounts[i], 'ts': ts[i], 'amount_cents': amounts[i]}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate synthetic business transactions and summarize them')
+    parser.add_argument('--transactions', type=int, default=1_000_000)
+    parser.add_argument('--accounts', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    txns = generate(args.transactions, args.accounts, seed=args.seed)
+    seconds = time.perf_counter() - start
+
+    months = month_key(txns['day'])
+    print('Synthetic business transactions')
+    print('=' * 100)
+    print(f"  {len(txns['ts']):,} transactions, {txns['n_accounts']:,} accounts, "
+          f"{int(txns['scheduled'].sum()):,} scheduled, generated in {seconds:.2f}s")
+    print(f"  {'month':<10}{'count':>12}{'income $':>16}{'expenses $':>16}")
+    for key in np.unique(months):
+        amounts = txns['amount_cents'][months == key]
+        label = str(np.datetime64(int(key), 'M'))
+        print(f'  {label:<10}{len(amounts):>12,}{amounts[amounts > 0].sum() / 100:>16,.0f}'
+              f'{-amounts[amounts < 0].sum() / 100:>16,.0f}')
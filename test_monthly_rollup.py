@@ -0,0 +1,42 @@
+import numpy as np
+
+from assistant_service import AssistantService
+from monthly_rollup import MonthlyRollup
+from rollup_index import to_day
+
+
+def _two_novembers():
+    # 2024-10 through 2025-11: fourteen months, November twice, the last one still open
+    days, amounts = [], []
+    for month in np.arange(np.datetime64('2024-10'), np.datetime64('2025-12')):
+        first = to_day(month.astype('datetime64[D]'))
+        days += [first + 1, first + 2]
+        amounts += [8_000_000, -7_400_000]
+    # Current November: a small expense only
+    days[-2:] = [to_day('2025-11-03')]
+    amounts[-2:] = [-209_200]
+    return MonthlyRollup.from_transactions(np.zeros(len(days), dtype=np.int64), np.array(days), np.array(amounts))
+
+
+def test_months_default_to_twelve_unique_labels():
+    rollup = _two_novembers()
+    assert rollup.n_closed + 1 == 14
+
+    rows = rollup.months(0)
+    labels = [row['month'] for row in rows]
+    assert len(rows) == 12
+    assert len(set(labels)) == 12
+    assert labels[0] == 'Dec' and labels[-1] == 'Nov'
+    assert rows[-1]['expenses'] == 2092.0
+
+    full = rollup.months(0, count=None)
+    assert [row['month'] for row in full].count('Nov') == 2
+
+
+def test_assistant_answers_the_current_month():
+    rollup = _two_novembers()
+    service = AssistantService()
+    for account, months in (('trailing', rollup.months(0)), ('full', rollup.months(0, count=None))):
+        service.set_data(account, months)
+        answer = service.answer(account, 'How were expenses in November?')
+        assert '$2K' in answer and '$74K' not in answer
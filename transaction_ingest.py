@@ -0,0 +1,226 @@
+# Streaming ingest for the "PNC Bank API (real-time transaction data)" and
+# "Connected bank APIs (real-time)" sources behind the hero graph and the
+# Real-Time Balance Card.
+#
+# Transactions arrive as newline-delimited JSON, one event per line:
+#
+#   {"id": "evt-000001", "account": "PNC-0001", "ts": 1760745600.0, "amount_cents": -125000}
+#
+# The feed is read lazily and in batches, so memory does not depend on how
+# long the feed is. Running balances and per-day aggregates are updated in
+# place. Events may arrive out of order by up to `lateness` seconds and may be
+# redelivered; both are absorbed idempotently. A day is closed (handed to
+# `on_day_closed`, e.g. RollupIndex.append_day) once the watermark has moved
+# past it by `lateness`, and its dedup ids are dropped with it.
+
+import argparse
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from itertools import islice
+
+SECONDS_PER_DAY = 86400
+DEFAULT_LATENESS = 2 * 3600
+DEFAULT_BATCH_SIZE = 1000
+
+
+def read_feed(path, follow=False, poll_interval=0.5):
+    """Yield events from an NDJSON feed one line at a time; with follow=True keep tailing it."""
+    with open(path, 'r', encoding='utf-8') as f:
+        while True:
+            line = f.readline()
+            if not line:
+                if not follow:
+                    return
+                time.sleep(poll_interval)
+                continue
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def batched(events, size=DEFAULT_BATCH_SIZE):
+    """Group an event iterator into lists of at most `size` events."""
+    events = iter(events)
+    while True:
+        batch = list(islice(events, size))
+        if not batch:
+            return
+        yield batch
+
+
+class IngestStats:
+    """Throughput and lag counters for one ingest run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.events = 0
+        self.applied = 0
+        self.duplicates = 0
+        self.late = 0
+        self.batches = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+
+    def observe_lag(self, lag):
+        self.lag_total += lag
+        if lag > self.lag_max:
+            self.lag_max = lag
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            'events': self.events,
+            'applied': self.applied,
+            'duplicates': self.duplicates,
+            'late': self.late,
+            'batches': self.batches,
+            'elapsed_sec': elapsed,
+            'events_per_sec': self.events / elapsed if elapsed else 0.0,
+            'avg_lag_sec': self.lag_total / self.events if self.events else 0.0,
+            'max_lag_sec': self.lag_max,
+        }
+
+
+class TransactionIngest:
+    """Incrementally maintained balances and daily aggregates for a transaction stream."""
+
+    def __init__(self, opening_balances=None, lateness=DEFAULT_LATENESS,
+                 on_day_closed=None, on_late=None, clock=time.time):
+        self.balances = defaultdict(int, opening_balances or {})
+        # (account, day) -> [inflow_cents, outflow_cents, count] for days still open
+        self.daily = {}
+        # day -> ids seen on that day, kept only while the day is open
+        self.seen = defaultdict(set)
+        self.lateness = lateness
+        self.watermark = None
+        self.closed_through = None
+        self.on_day_closed = on_day_closed
+        self.on_late = on_late
+        self.clock = clock
+        self.stats = IngestStats()
+
+    def apply(self, event):
+        """Apply one event. Returns True if it changed state."""
+        stats = self.stats
+        stats.events += 1
+        ts = float(event['ts'])
+        day = int(ts // SECONDS_PER_DAY)
+        stats.observe_lag(max(0.0, self.clock() - ts))
+
+        if self.closed_through is not None and day <= self.closed_through:
+            # Too late to dedupe safely; leave it for reconciliation
+            stats.late += 1
+            if self.on_late:
+                self.on_late(event)
+            return False
+
+        ids = self.seen[day]
+        event_id = event['id']
+        if event_id in ids:
+            stats.duplicates += 1
+            return False
+        ids.add(event_id)
+
+        account = event['account']
+        amount = int(event['amount_cents'])
+        self.balances[account] += amount
+
+        agg = self.daily.get((account, day))
+        if agg is None:
+            agg = self.daily[(account, day)] = [0, 0, 0]
+        if amount >= 0:
+            agg[0] += amount
+        else:
+            agg[1] -= amount
+        agg[2] += 1
+
+        stats.applied += 1
+        if self.watermark is None or ts > self.watermark:
+            self.watermark = ts
+        return True
+
+    def apply_batch(self, batch):
+        for event in batch:
+            self.apply(event)
+        self.stats.batches += 1
+        self.close_days()
+
+    def close_days(self, force=False):
+        """Close every day the watermark has passed by `lateness` (or all open days with force=True)."""
+        if self.watermark is None:
+            return
+        if force:
+            cutoff = max(self.seen) if self.seen else self.closed_through
+        else:
+            cutoff = int((self.watermark - self.lateness) // SECONDS_PER_DAY) - 1
+        if cutoff is None or (self.closed_through is not None and cutoff <= self.closed_through):
+            return
+
+        closing = sorted((key for key in self.daily if key[1] <= cutoff), key=lambda key: (key[1], key[0]))
+        for key in closing:
+            agg = self.daily.pop(key)
+            if self.on_day_closed:
+                account, day = key
+                self.on_day_closed(account, day, agg[0], agg[1], agg[2])
+        for day in [day for day in self.seen if day <= cutoff]:
+            del self.seen[day]
+        self.closed_through = cutoff
+
+    def run(self, events, batch_size=DEFAULT_BATCH_SIZE):
+        """Consume an event iterator to the end and return the stats report."""
+        for batch in batched(events, batch_size):
+            self.apply_batch(batch)
+        return self.stats.report()
+
+
+def write_sample_feed(path, n_events, n_accounts=50, start_ts=None, seed=0,
+                      duplicate_rate=0.01, max_disorder=3600):
+    """Local stand-in for the bank feed: jittered timestamps and some redeliveries."""
+    rnd = random.Random(seed)
+    ts = start_ts if start_ts is not None else time.time() - n_events * 30
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(n_events):
+            ts += rnd.expovariate(1 / 30)
+            event = {
+                'id': f'evt-{i:09d}',
+                'account': f'PNC-{rnd.randrange(n_accounts):04d}',
+                'ts': round(ts - rnd.random() * max_disorder, 3),
+                'amount_cents': int(rnd.gauss(0, 250000)),
+            }
+            line = json.dumps(event) + '\n'
+            f.write(line)
+            if rnd.random() < duplicate_rate:
+                f.write(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ingest an NDJSON transaction feed')
+    parser.add_argument('feed', help='path to the NDJSON feed')
+    parser.add_argument('--generate', type=int, metavar='N', help='first write a sample feed of N events')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--follow', action='store_true', help='keep tailing the feed')
+    args = parser.parse_args()
+
+    if args.generate:
+        write_sample_feed(args.feed, args.generate)
+        print(f'Wrote {args.generate:,} events to {args.feed} ({os.path.getsize(args.feed):,} bytes)')
+
+    closed_days = 0
+
+    def count_closed(account, day, inflow, outflow, count):
+        global closed_days
+        closed_days += 1
+
+    ingest = TransactionIngest(on_day_closed=count_closed)
+    report = ingest.run(read_feed(args.feed, follow=args.follow), args.batch_size)
+    ingest.close_days(force=True)
+
+    print('Transaction ingest')
+    print('=' * 100)
+    for key, value in report.items():
+        print(f'  {key:<16} {value:,.3f}' if isinstance(value, float) else f'  {key:<16} {value:,}')
+    print(f'  {"accounts":<16} {len(ingest.balances):,}')
+    print(f'  {"closed_days":<16} {closed_days:,}')
@@ -0,0 +1,355 @@
+# Packed in-memory transaction records with a per-account memory budget,
+# the shared in-memory form of transactions for the backend engines.
+#
+# monthly_rollup.MonthlyRollup.from_table() and
+# columnar_store.ColumnarStore.write_table() read a TransactionTable
+# directly. The other engines (rollup_index, insight_rules, fraud_detector,
+# receivables_aging) still take their own inputs and are converted one at a
+# time.
+#
+# One transaction is one TXN_DTYPE record, 23 bytes with no padding:
+#
+#   day           int32   days since 1970-01-01
+#   cents         int64   signed amount
+#   account       uint32  interned account id
+#   counterparty  uint32  interned counterparty id
+#   category      uint8   interned category code
+#   bank          uint8   interned bank code
+#   flags         uint8   FLAG_SCHEDULED, ...
+#
+# Strings (accounts, counterparties, categories, banks) are stored once in an
+# Interner and referenced by id. A TransactionTable holds the records in one
+# growable structured array; column code reads table.data['cents'] etc.
+# directly, row-level code uses table[i], a __slots__ TransactionRow that
+# decodes fields on access. Every table has a per-account byte budget:
+# policy='raise' rejects an extend() that would exceed it (BudgetExceeded,
+# none of its rows are stored), policy='truncate' keeps each account's newest
+# rows that fit.
+# memory_report() gives bytes per transaction including the intern tables.
+
+import argparse
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+TXN_DTYPE = np.dtype([
+    ('day', '<i4'),
+    ('cents', '<i8'),
+    ('account', '<u4'),
+    ('counterparty', '<u4'),
+    ('category', 'u1'),
+    ('bank', 'u1'),
+    ('flags', 'u1'),
+])
+FLAG_SCHEDULED = 1
+ACCOUNT_BUDGET = 4 << 20
+POLICIES = ('raise', 'truncate')
+SECONDS_PER_DAY = 86400
+
+
+class BudgetExceeded(ValueError):
+    def __init__(self, account, needed, budget):
+        super().__init__(f'account {account} needs {needed:,} bytes, over its {budget:,} byte budget')
+        self.account = account
+        self.needed = needed
+        self.budget = budget
+
+
+class Interner:
+    """Value <-> small integer id; ids are dense and assigned in first-seen order."""
+
+    def __init__(self, values=(), limit=None):
+        self.values = []
+        self._ids = {}
+        self.limit = limit
+        for value in values:
+            self.id(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, value_id):
+        return self.values[value_id]
+
+    def id(self, value):
+        value_id = self._ids.get(value)
+        if value_id is None:
+            if self.limit is not None and len(self.values) >= self.limit:
+                raise ValueError(f'more than {self.limit} distinct values; cannot intern {value!r}')
+            value_id = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+    def ids(self, values):
+        return np.fromiter((self.id(v) for v in values), dtype=np.int64, count=len(values))
+
+    def nbytes(self):
+        return sys.getsizeof(self.values) + sys.getsizeof(self._ids) + sum(sys.getsizeof(v) for v in self.values)
+
+
+class TransactionRow:
+    """Read-only view of one record; fields are decoded when accessed."""
+
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def _field(self, name):
+        return self.table._data[name][self.index]
+
+    @property
+    def day(self):
+        return int(self._field('day'))
+
+    @property
+    def date(self):
+        return np.datetime64(self.day, 'D').item()
+
+    @property
+    def cents(self):
+        return int(self._field('cents'))
+
+    @property
+    def amount(self):
+        return self.cents / 100
+
+    @property
+    def account(self):
+        return self.table.accounts[self._field('account')]
+
+    @property
+    def counterparty(self):
+        return self.table.counterparties[self._field('counterparty')]
+
+    @property
+    def category(self):
+        return self.table.categories[self._field('category')]
+
+    @property
+    def bank(self):
+        return self.table.banks[self._field('bank')]
+
+    @property
+    def scheduled(self):
+        return bool(self._field('flags') & FLAG_SCHEDULED)
+
+    def as_dict(self):
+        return {'date': self.date.isoformat(), 'account': self.account, 'amount': self.amount,
+                'category': self.category, 'counterparty': self.counterparty, 'bank': self.bank,
+                'scheduled': self.scheduled}
+
+    def __repr__(self):
+        return f'TransactionRow({self.as_dict()})'
+
+
+class TransactionTable:
+    def __init__(self, account_budget=ACCOUNT_BUDGET, policy='raise', accounts=None, counterparties=None,
+                 categories=None, banks=None, capacity=1024):
+        if policy not in POLICIES:
+            raise ValueError(f'policy must be one of {POLICIES}, not {policy!r}')
+        self.account_budget = account_budget
+        self.policy = policy
+        self.accounts = accounts if accounts is not None else Interner()
+        self.counterparties = counterparties if counterparties is not None else Interner()
+        self.categories = categories if categories is not None else Interner(limit=256)
+        self.banks = banks if banks is not None else Interner(limit=256)
+        self._data = np.zeros(capacity, dtype=TXN_DTYPE)
+        self.size = 0
+        # Rows held per account id
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.truncated = 0
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if not -self.size <= index < self.size:
+            raise IndexError(f'row {index} out of range for {self.size} rows')
+        return TransactionRow(self, index % self.size)
+
+    def __iter__(self):
+        return (TransactionRow(self, i) for i in range(self.size))
+
+    @property
+    def data(self):
+        return self._data[:self.size]
+
+    @property
+    def rows_per_account(self):
+        return self.account_budget // TXN_DTYPE.itemsize
+
+    def _grow(self, needed):
+        capacity = len(self._data)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        data = np.zeros(capacity, dtype=TXN_DTYPE)
+        data[:self.size] = self.data
+        self._data = data
+
+    def extend(self, account, day, cents, category=0, bank=0, counterparty=0, flags=0):
+        """Append coded columns (ids from this table's interners); returns the rows added."""
+        account = np.asarray(account, dtype=np.int64)
+        n = len(account)
+        if not n:
+            return 0
+        counts = np.bincount(account, minlength=max(len(self.counts), len(self.accounts)))
+        counts[:len(self.counts)] += self.counts
+        over = np.flatnonzero(counts > self.rows_per_account)
+        if len(over) and self.policy == 'raise':
+            worst = over[np.argmax(counts[over])]
+            raise BudgetExceeded(self.accounts[worst] if worst < len(self.accounts) else int(worst),
+                                 int(counts[worst]) * TXN_DTYPE.itemsize, self.account_budget)
+
+        self._grow(self.size + n)
+        new = self._data[self.size:self.size + n]
+        new['account'] = account
+        new['day'] = day
+        new['cents'] = cents
+        new['category'] = category
+        new['bank'] = bank
+        new['counterparty'] = counterparty
+        new['flags'] = flags
+        self.size += n
+        self.counts = counts
+        if len(over):
+            self._truncate(over)
+        return n
+
+    def _truncate(self, accounts):
+        """Drop the oldest rows of over-budget accounts until each fits."""
+        data = self.data
+        rows = np.flatnonzero(np.isin(data['account'], accounts))
+        # Newest first within each account; rows past the budget are the ones to drop
+        rows = rows[np.lexsort((-data['day'][rows], data['account'][rows]))]
+        ids = data['account'][rows]
+        starts = np.searchsorted(ids, ids)
+        past_budget = np.arange(len(rows)) - starts >= self.rows_per_account
+        drop = rows[past_budget]
+        self.counts -= np.bincount(ids[past_budget], minlength=len(self.counts))
+        keep = np.ones(self.size, dtype=bool)
+        keep[drop] = False
+        kept = data[keep]
+        self._data[:len(kept)] = kept
+        self.size = len(kept)
+        self.truncated += len(drop)
+
+    def for_account(self, account):
+        """Records of one account (by name), as a copy in table order."""
+        data = self.data
+        return data[data['account'] == self.accounts.id(account)]
+
+    def memory_report(self):
+        intern_bytes = sum(i.nbytes() for i in (self.accounts, self.counterparties, self.categories, self.banks))
+        held = self.size * TXN_DTYPE.itemsize
+        allocated = self._data.nbytes
+        return {
+            'rows': self.size,
+            'accounts': int(np.count_nonzero(self.counts)),
+            'record_bytes': TXN_DTYPE.itemsize,
+            'held_bytes': held,
+            'allocated_bytes': allocated,
+            'intern_bytes': intern_bytes,
+            'bytes_per_transaction': (allocated + intern_bytes) / self.size if self.size else 0.0,
+            'largest_account_bytes': int(self.counts.max(initial=0)) * TXN_DTYPE.itemsize,
+            'account_budget': self.account_budget,
+            'truncated_rows': self.truncated,
+        }
+
+
+def load_columns(txns, categories, bank='SYNTHETIC', account_names=None, **table_args):
+    """Table from synthetic_business.generate() columns (integer account, category and counterparty ids)."""
+    n_accounts = txns['n_accounts']
+    table_args.setdefault('capacity', max(len(txns['day']), 1))
+    table = TransactionTable(**table_args)
+    table.counterparties.id('')
+    for name in account_names or (f'ACCT-{i:06d}' for i in range(n_accounts)):
+        table.accounts.id(name)
+    for name in categories:
+        table.categories.id(name)
+    # Synthetic counterparties are dense ids, -1 for none (scheduled payments); intern a name per id used
+    shifted = txns['counterparty'].astype(np.int64) + 1
+    used = np.flatnonzero(np.bincount(shifted))
+    remap = np.zeros(used[-1] + 1 if len(used) else 0, dtype=np.uint32)
+    remap[used] = [table.counterparties.id(f'CP-{cp - 1:05d}' if cp else '') for cp in used.tolist()]
+    counterparty = remap[shifted]
+    table.extend(txns['account'], txns['day'], txns['amount_cents'], txns['category'],
+                 table.banks.id(bank), counterparty, np.where(txns['scheduled'], FLAG_SCHEDULED, 0))
+    return table
+
+
+def _bank_of(account):
+    return account.split('-', 1)[0] if isinstance(account, str) else 'UNKNOWN'
+
+
+def load_events(events, batch_size=100_000, **table_args):
+    """Table from ingest-style event dicts ({'account', 'ts', 'amount_cents'} plus optional
+    'category', 'counterparty', 'bank'; the bank defaults to the account prefix, PNC-0001 -> PNC)."""
+    table = TransactionTable(**table_args)
+    table.counterparties.id('')
+    batch = []
+
+    def flush():
+        table.extend(
+            [table.accounts.id(e['account']) for e in batch],
+            [int(e['ts'] // SECONDS_PER_DAY) for e in batch],
+            [e['amount_cents'] for e in batch],
+            [table.categories.id(e.get('category', 'Other')) for e in batch],
+            [table.banks.id(e.get('bank') or _bank_of(e['account'])) for e in batch],
+            [table.counterparties.id(e.get('counterparty', '')) for e in batch],
+        )
+        batch.clear()
+
+    for event in events:
+        batch.append(event)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return table
+
+
+def dict_bytes_per_transaction(events):
+    """Bytes per transaction held as a list of event dicts, for comparison."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = list(events)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return size / len(held) if held else 0.0
+
+
+if __name__ == '__main__':
+    from synthetic_business import CATEGORIES, generate, iter_events
+
+    parser = argparse.ArgumentParser(description='Load synthetic transactions into packed records and report memory')
+    parser.add_argument('--transactions', type=int, default=1_000_000)
+    parser.add_argument('--budget', type=int, default=ACCOUNT_BUDGET, help='bytes per account')
+    parser.add_argument('--dict-sample', type=int, default=100_000, help='rows measured as event dicts')
+    args = parser.parse_args()
+
+    txns = generate(args.transactions)
+    start = time.perf_counter()
+    table = load_columns(txns, CATEGORIES, account_budget=args.budget, policy='truncate')
+    load_seconds = time.perf_counter() - start
+    report = table.memory_report()
+
+    start = time.perf_counter()
+    events = load_events(iter_events(txns, args.dict_sample))
+    event_seconds = time.perf_counter() - start
+
+    print('Packed transaction records')
+    print('=' * 100)
+    print(f"  {report['rows']:,} rows, {report['accounts']:,} accounts, loaded in {load_seconds * 1000:.0f}ms "
+          f"({args.dict_sample:,} events: {event_seconds * 1000:.0f}ms)")
+    print(f"  record {report['record_bytes']} bytes; {report['bytes_per_transaction']:.1f} bytes per transaction "
+          f"with growth slack and intern tables")
+    print(f"  event dicts: {dict_bytes_per_transaction(iter_events(txns, args.dict_sample)):.0f} bytes per transaction")
+    print(f"  largest account {report['largest_account_bytes']:,} bytes of {report['account_budget']:,} budget; "
+          f"{report['truncated_rows']:,} oldest rows truncated")
+    print(f'  table[-1]: {table[-1]}')